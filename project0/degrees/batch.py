@@ -0,0 +1,97 @@
+"""
+Non-interactive batch queries for degrees.py.
+
+Each input line holds a source person followed by one or more target
+people, separated by tabs. People may be given by id or by name. Every
+(source, target) pair produces one JSON line on standard output.
+
+Search trees are cached per source (least recently used first out), so
+repeated sources are answered from the tree already built for them.
+"""
+import argparse
+import functools
+import json
+import sys
+
+import degrees
+
+
+def resolve(person):
+    """
+    Returns the person_id for an id or an unambiguous name.
+    Raises LookupError if the person cannot be identified.
+    """
+    if person in degrees.people:
+        return person
+    person_id = degrees.resolve_name(person)
+    if person_id is not None:
+        return person_id
+
+    suggestions = [candidate["name"]
+                   for candidate in degrees.name_candidates(person, limit=3)]
+    if suggestions:
+        raise LookupError(
+            f"person {person!r} not found, did you mean: {', '.join(suggestions)}"
+        )
+    raise LookupError(f"person {person!r} not found")
+
+
+def answer(tree_for, source, target):
+    """
+    Returns the JSON-serializable result of one query.
+    """
+    result = {"source": source, "target": target}
+    try:
+        source_id = resolve(source)
+        target_id = resolve(target)
+    except LookupError as e:
+        result["error"] = str(e)
+        return result
+
+    path = tree_for(source_id).path_to(target_id)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [list(step) for step in path]
+    return result
+
+
+def queries(f):
+    """
+    Yields (source, target) pairs from tab-separated lines in `f`.
+    """
+    for line in f:
+        fields = [field.strip() for field in line.rstrip("\n").split("\t")]
+        fields = [field for field in fields if field]
+        if len(fields) < 2:
+            continue
+        source = fields[0]
+        for target in fields[1:]:
+            yield source, target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer degrees queries in bulk.")
+    parser.add_argument("directory", metavar="directory | snapshot")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file of tab-separated queries (default: stdin)")
+    parser.add_argument("--cache", type=int, default=64,
+                        help="number of source search trees to keep")
+    args = parser.parse_args()
+
+    degrees.load(args.directory)
+    tree_for = functools.lru_cache(maxsize=args.cache)(degrees.SearchTree)
+
+    f = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    with f:
+        for source, target in queries(f):
+            print(json.dumps(answer(tree_for, source, target)), flush=True)
+
+    info = tree_for.cache_info()
+    print(f"{info.hits} cache hits, {info.misses} misses", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark for the degrees loading and search pipeline.
+
+For each dataset (a data directory, a snapshot, or a synthetic graph
+generated on the fly) this times loading, then runs every mode in
+degrees.SEARCHES on the same random source/target pairs and reports
+wall time, expanded states and the largest frontier, optionally with
+the peak memory allocated by a single search. Searching and path
+reconstruction are also timed separately, and results can be written
+as JSON lines to track regressions over time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import ingest
+import synthetic
+
+
+def sample_pairs(count, seed):
+    """
+    Returns `count` random (source, target) pairs of people
+    who starred in at least one movie.
+    """
+    rng = random.Random(seed)
+    people = [person_id for person_id in sorted(degrees.people)
+              if degrees.person_movies(degrees.person_key(person_id))]
+    return [(rng.choice(people), rng.choice(people)) for _ in range(count)]
+
+
+def peak_memory(search, pairs):
+    """
+    Returns the largest number of bytes allocated while running
+    `search` on any one of `pairs`.
+    """
+    peak = 0
+    tracemalloc.start()
+    for source, target in pairs:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        search(source, target)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(pairs, modes, memory=False):
+    """
+    Returns a dict of results per search mode over `pairs`.
+
+    Peak memory is measured in a separate, untimed pass when `memory`
+    is set, since tracing allocations slows searches down.
+    """
+    results = {}
+    lengths = {}
+    for mode in modes:
+        search = degrees.SEARCHES[mode]
+        elapsed = 0
+        expanded = 0
+        max_frontier = 0
+        for source, target in pairs:
+            stats = {"expanded": 0}
+            start = time.perf_counter()
+            path = search(source, target, stats=stats)
+            elapsed += time.perf_counter() - start
+            expanded += stats["expanded"]
+            max_frontier = max(max_frontier, stats.get("max_frontier", 0))
+
+            # Every mode must agree on the degrees of separation
+            length = None if path is None else len(path)
+            if lengths.setdefault((source, target), length) != length:
+                raise RuntimeError(
+                    f"{mode} found {length} degrees from {source} to {target}, "
+                    f"expected {lengths[(source, target)]}"
+                )
+
+        results[mode] = {
+            "seconds": elapsed,
+            "mean_expanded": expanded / len(pairs),
+            "max_frontier": max_frontier,
+        }
+        if memory:
+            results[mode]["peak_bytes"] = peak_memory(search, pairs)
+    return results
+
+
+def load(path, columnar=False, memory=False):
+    """
+    Loads `path` into degrees and returns the load time in seconds,
+    the process's peak RSS and, if `memory` is set, the peak memory
+    traced while loading.
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    degrees.load(path, columnar)
+    result = {
+        "seconds": time.perf_counter() - start,
+        "peak_rss_bytes": ingest.peak_rss(),
+    }
+    if memory:
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def phases(pairs):
+    """
+    Returns the seconds spent searching and reconstructing paths over
+    `pairs`, timed separately with a person-level SearchTree.
+    """
+    search = 0
+    reconstruct = 0
+    for source, target in pairs:
+        start = time.perf_counter()
+        tree = degrees.SearchTree(source)
+        target_key = degrees.person_key(target)
+        reached = tree.reach(target_key)
+        middle = time.perf_counter()
+        if reached:
+            degrees.trace_path(target_key, tree.parents)
+        end = time.perf_counter()
+        search += middle - start
+        reconstruct += end - middle
+    return {"search_seconds": search, "reconstruct_seconds": reconstruct}
+
+
+def scaling(pairs, counts, path=None, columnar=False):
+    """
+    Returns (workers, seconds) for the parallel search over `pairs`
+    with each worker count in `counts`. Workers that cannot be forked
+    load `path` themselves.
+    """
+    timings = []
+    for count in counts:
+        degrees.start_workers(count, path, columnar)
+        start = time.perf_counter()
+        for source, target in pairs:
+            degrees.parallel_shortest_path(source, target)
+        timings.append((count, time.perf_counter() - start))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees searches.")
+    parser.add_argument("paths", nargs="*", metavar="directory | snapshot")
+    parser.add_argument("--synthetic", type=int, nargs="+", metavar="PEOPLE",
+                        help="also benchmark generated graphs of these sizes")
+    parser.add_argument("--distribution", choices=synthetic.DISTRIBUTIONS,
+                        default="zipf", help="actor popularity of generated graphs")
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", choices=degrees.SEARCHES)
+    parser.add_argument("--columnar", action="store_true",
+                        help="load CSV files into a compact graph")
+    parser.add_argument("--landmarks", metavar="FILE",
+                        help="landmark file, required by the landmark mode")
+    parser.add_argument("--memory", action="store_true",
+                        help="also report peak memory of loading and each search")
+    parser.add_argument("--workers", type=int, nargs="+", metavar="N",
+                        help="time the parallel search with N workers "
+                             "(default 1 2 4 8 when the parallel mode is run)")
+    parser.add_argument("--json", metavar="FILE",
+                        help="append results as JSON lines to FILE ('-' for stdout)")
+    args = parser.parse_args()
+    modes = args.modes or [mode for mode in degrees.SEARCHES
+                           if mode != "landmark" or args.landmarks]
+    if args.workers is None and "parallel" in modes:
+        args.workers = [1, 2, 4, 8]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = list(args.paths)
+        for people in args.synthetic or []:
+            directory = os.path.join(scratch, f"synthetic-{people}")
+            synthetic.generate(directory, people, max(1, people // 5),
+                               distribution=args.distribution, seed=args.seed)
+            paths.append(directory)
+        if not paths:
+            parser.error("no datasets given")
+
+        for path in paths:
+            result = run(path, modes, args)
+            result["dataset"] = os.path.basename(path)
+            if args.json == "-":
+                print(json.dumps(result))
+            elif args.json is not None:
+                with open(args.json, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+
+
+def run(path, modes, args):
+    """
+    Benchmarks one dataset, printing a report, and returns the results.
+    """
+    columnar = args.columnar or args.landmarks is not None
+    loading = load(path, columnar, args.memory)
+    if args.landmarks is not None:
+        degrees.load_landmarks(args.landmarks)
+    pairs = sample_pairs(args.pairs, args.seed)
+
+    print(f"{path}: {len(degrees.people)} people, {len(pairs)} queries")
+    line = f"    loaded in {loading['seconds']:.3f}s"
+    if loading["peak_rss_bytes"] is not None:
+        line += f", peak RSS {loading['peak_rss_bytes'] / 2 ** 20:.1f} MiB"
+    print(line)
+
+    header = f"    {'mode':<16}{'seconds':>10}{'expanded':>12}{'max frontier':>14}"
+    if args.memory:
+        header += f"{'peak KiB':>12}"
+    print(header)
+    searches = benchmark(pairs, modes, args.memory)
+    for mode, result in searches.items():
+        line = (f"    {mode:<16}{result['seconds']:>10.4f}"
+                f"{result['mean_expanded']:>12.1f}{result['max_frontier']:>14}")
+        if args.memory:
+            line += f"{result['peak_bytes'] / 1024:>12.1f}"
+        print(line)
+
+    split = phases(pairs)
+    print(f"    search {split['search_seconds']:.4f}s, "
+          f"path reconstruction {split['reconstruct_seconds']:.4f}s")
+
+    result = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "people": len(degrees.people),
+        "movies": len(degrees.movies),
+        "pairs": len(pairs),
+        "seed": args.seed,
+        "load": loading,
+        "modes": searches,
+        "phases": split,
+    }
+
+    if args.workers:
+        print(f"    {'workers':<16}{'seconds':>10}{'speedup':>12}")
+        timings = scaling(pairs, args.workers, path, columnar)
+        for count, seconds in timings:
+            print(f"    {count:<16}{seconds:>10.4f}"
+                  f"{timings[0][1] / seconds:>11.2f}x")
+        result["workers"] = {str(count): seconds for count, seconds in timings}
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
+import argparse
 import csv
+import itertools
+import multiprocessing
+import os
 import sys
 
+from graph import Graph
+from landmarks import Landmarks
+from nameindex import NameIndex
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,6 +19,26 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact graph store backing the mappings above, when loaded from a snapshot
+graph = None
+
+# Landmark distance oracle over `graph`, see load_landmarks()
+landmarks = None
+
+# Prefix and fuzzy index over `names`, built on first use by name_index()
+names_index = None
+
+# Worker processes used by parallel_shortest_path, see start_workers()
+pool = None
+pool_size = 0
+
+# Frontiers smaller than this are expanded without the worker pool
+PARALLEL_THRESHOLD = 2000
+
+# Per-query expansion state, kept separately inside each worker process
+worker_state = {"query": None, "people": set(), "movies": set()}
+query_ids = itertools.count()
+
 
 def load_data(directory):
     """
@@ -52,16 +79,99 @@ def load_data(directory):
                 pass
 
 
+def load_snapshot(path):
+    """
+    Load a binary snapshot written by graph.py. The snapshot is
+    memory-mapped and `names`, `people` and `movies` become read-only
+    views over it.
+    """
+    use_graph(Graph.load(path))
+
+
+def load_columns(directory):
+    """
+    Load data from CSV files into a compact in-memory graph, parsing
+    the files in columnar chunks. Display fields other than names are
+    only read when first accessed.
+    """
+    use_graph(Graph.from_csv(directory))
+
+
+def use_graph(g):
+    """
+    Makes `names`, `people` and `movies` read-only views over graph `g`.
+    """
+    global graph, names, people, movies
+    graph = g
+    names = graph.names
+    people = graph.people
+    movies = graph.movies
+
+
+def load(path, columnar=False):
+    """
+    Load a data directory, or a snapshot if `path` is a file.
+    """
+    global graph, names, people, movies, landmarks, names_index
+    graph = None
+    names = {}
+    people = {}
+    movies = {}
+    landmarks = None
+    names_index = None
+
+    # Workers forked earlier would still see the previous data
+    stop_workers()
+    if os.path.isfile(path):
+        load_snapshot(path)
+    elif columnar:
+        load_columns(path)
+    else:
+        load_data(path)
+
+
+def load_landmarks(path):
+    """
+    Load a landmark file written by landmarks.py for the loaded graph.
+    """
+    global landmarks
+    if graph is None:
+        raise Exception("landmarks need a snapshot or columnar data")
+    oracle = Landmarks.load(path)
+    if oracle.person_count != graph.person_count:
+        raise Exception(f"{path} was computed for a different dataset")
+    landmarks = oracle
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [--search MODE] [--columnar] "
+              "[--landmarks FILE] [directory | snapshot]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--columnar", action="store_true",
+                        help="load CSV files into a compact graph")
+    parser.add_argument("--search", choices=SEARCHES, default="bfs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes for --search parallel")
+    parser.add_argument("--landmarks", metavar="FILE",
+                        help="landmark file for --search landmark")
+    args = parser.parse_args()
+    if args.search == "landmark" and args.landmarks is None:
+        parser.error("--search landmark requires --landmarks FILE")
+    directory = args.directory
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    columnar = args.columnar or args.landmarks is not None
+    load(directory, columnar)
+    if args.landmarks is not None:
+        load_landmarks(args.landmarks)
     print("Data loaded.")
 
+    if args.search == "parallel":
+        start_workers(args.workers, directory, columnar)
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +179,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = SEARCHES[args.search](source, target)
 
     if path is None:
         print("Not connected.")
@@ -89,12 +199,15 @@ def path(parent,node,res):
     path(parent,parent[node],res)
     res.append(node)
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If `stats` is a dict, the number of expanded states and the largest
+    frontier size are recorded in it.
     """
     q = QueueFrontier()
     q.add((-1,source))
@@ -104,6 +217,9 @@ def shortest_path(source, target):
     visited = set()
 
     while(q.empty()==False):
+        if stats is not None:
+            record(stats, len(q.frontier))
+
         current_state  = q.remove()
 
         if(current_state[1] == goal):
@@ -114,10 +230,13 @@ def shortest_path(source, target):
         if(current_state in visited):
             continue
 
+        if stats is not None:
+            stats["expanded"] += 1
+
         neighbors = neighbors_for_person(current_state[1])
 
         for neighbor in neighbors:
-            if(neighbor not in visited):
+            if(neighbor not in visited and neighbor not in parent):
 
                 parent[neighbor] = current_state
                 q.add(neighbor)
@@ -131,6 +250,372 @@ def shortest_path(source, target):
         
     return None
 
+
+def bidirectional_shortest_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both
+    ends at once and always expanding the smaller frontier.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    source, target = person_key(source), person_key(target)
+
+    # Map each reached person to (movie, person one step closer to its end)
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if stats is not None:
+            record(stats, len(forward_frontier) + len(backward_frontier))
+
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, stats
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, stats
+            )
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def expand_level(frontier, parents, others, stats=None):
+    """
+    Expands every person in `frontier` by one movie, recording new
+    people in `parents`. Returns the next frontier and the first person
+    also reached from the other end (in `others`), if any.
+
+    Every meeting person found while expanding a level lies at the same
+    distance from the other end, so the first one gives a shortest path.
+    """
+    next_frontier = []
+    for person in frontier:
+        if stats is not None:
+            stats["expanded"] += 1
+        for movie in person_movies(person):
+            for star in movie_stars(movie):
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                if star in others:
+                    return next_frontier, star
+                next_frontier.append(star)
+    return next_frontier, None
+
+
+def person_shortest_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    Unlike shortest_path, states are people rather than (movie, person)
+    pairs: each person is enqueued once, each movie's cast is scanned
+    once, and the connecting movie is only kept in the parent map.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    source, target = person_key(source), person_key(target)
+
+    parents = {source: None}
+    seen_movies = set()
+    frontier = QueueFrontier()
+    frontier.add(source)
+
+    while not frontier.empty():
+        if stats is not None:
+            record(stats, len(frontier.frontier))
+            stats["expanded"] += 1
+
+        person = frontier.remove()
+        for movie in person_movies(person):
+            if movie in seen_movies:
+                continue
+            seen_movies.add(movie)
+            for star in movie_stars(movie):
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                if star == target:
+                    return trace_path(star, parents)
+                frontier.add(star)
+
+    return None
+
+
+class SearchTree():
+    """
+    Breadth-first search tree rooted at one person, grown lazily.
+
+    The tree only expands as far as needed to reach each requested
+    target and resumes from where it stopped on the next request, so
+    one tree answers any number of queries that share a source.
+    """
+
+    def __init__(self, source):
+        self.source = person_key(source)
+        self.parents = {self.source: None}
+        self.seen_movies = set()
+        self.frontier = QueueFrontier()
+        self.frontier.add(self.source)
+
+    def reach(self, target):
+        """
+        Expands the tree until `target` (a person key) is in it.
+        Returns False if the target is not connected to the source.
+        """
+        parents = self.parents
+        while target not in parents:
+            if self.frontier.empty():
+                return False
+            person = self.frontier.remove()
+            for movie in person_movies(person):
+                if movie in self.seen_movies:
+                    continue
+                self.seen_movies.add(movie)
+                for star in movie_stars(movie):
+                    if star not in parents:
+                        parents[star] = (movie, person)
+                        self.frontier.add(star)
+        return True
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        from the source to `target`, or None if not connected.
+        """
+        target = person_key(target)
+        if not self.reach(target):
+            return None
+        return trace_path(target, self.parents)
+
+
+def landmark_shortest_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    People the landmarks show are not connected are answered without
+    searching, which otherwise means exhausting the smaller of their
+    components; everyone else is searched by bidirectional_shortest_path.
+    Pruning that search by the landmark bounds costs more per person
+    than it saves.
+
+    If no possible path, returns None.
+    """
+    if landmarks is None:
+        raise Exception("no landmarks loaded")
+    if source == target:
+        return []
+    lower, _ = landmarks.bounds(person_key(source), person_key(target))
+    if lower is None:
+        return None
+    return bidirectional_shortest_path(source, target, stats)
+
+
+def estimate_degrees(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation
+    between two people from the landmark distances alone, without
+    searching. See Landmarks.bounds.
+    """
+    if landmarks is None:
+        raise Exception("no landmarks loaded")
+    return landmarks.bounds(person_key(source), person_key(target))
+
+
+def start_workers(count, path=None, columnar=False):
+    """
+    Starts (or restarts) the pool of `count` worker processes used by
+    parallel_shortest_path.
+
+    Forked workers share the already loaded data with this process:
+    a snapshot's mmap pages directly, and dicts copy-on-write. Where
+    processes cannot be forked, each worker loads `path` itself, with
+    the same `columnar` flag as this process so that both use the same
+    person keys.
+    """
+    global pool, pool_size
+    stop_workers()
+    if "fork" in multiprocessing.get_all_start_methods():
+        pool = multiprocessing.get_context("fork").Pool(count)
+    elif path is not None:
+        pool = multiprocessing.Pool(count, initializer=load, initargs=(path, columnar))
+    else:
+        raise ValueError("workers cannot be forked, so a data path is required")
+    pool_size = count
+
+
+def stop_workers():
+    """
+    Terminates the worker pool, if one is running.
+    """
+    global pool, pool_size
+    if pool is not None:
+        pool.terminate()
+    pool = None
+    pool_size = 0
+
+
+def parallel_shortest_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    Level-synchronous person-level BFS: each level's frontier is split
+    into slices that the worker pool expands in parallel, and the
+    discovered people are merged into the parent map in slice order.
+    Small levels are expanded in this process to avoid the IPC cost.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    if pool is None:
+        start_workers(os.cpu_count())
+    source, target = person_key(source), person_key(target)
+
+    query = next(query_ids)
+    parents = {source: None}
+    frontier = [source]
+
+    while frontier:
+        if stats is not None:
+            record(stats, len(frontier))
+            stats["expanded"] += len(frontier)
+
+        if len(frontier) < PARALLEL_THRESHOLD:
+            results = [expand_slice((query, frontier))]
+        else:
+            size = -(-len(frontier) // (4 * pool_size))
+            slices = [(query, frontier[i:i + size])
+                      for i in range(0, len(frontier), size)]
+            results = pool.map(expand_slice, slices)
+
+        frontier = []
+        for discovered in results:
+            for star, movie, person in discovered:
+                if star not in parents:
+                    parents[star] = (movie, person)
+                    frontier.append(star)
+        if target in parents:
+            return trace_path(target, parents)
+
+    return None
+
+
+def expand_slice(task):
+    """
+    Expands a slice of a BFS level inside a worker process. Returns
+    (star, movie, person) triples for people this worker has not
+    already reported during the same query.
+    """
+    query, people = task
+    if worker_state["query"] != query:
+        worker_state["query"] = query
+        worker_state["people"] = set()
+        worker_state["movies"] = set()
+    seen_people = worker_state["people"]
+    seen_movies = worker_state["movies"]
+
+    seen_people.update(people)
+    discovered = []
+    for person in people:
+        for movie in person_movies(person):
+            if movie in seen_movies:
+                continue
+            seen_movies.add(movie)
+            for star in movie_stars(movie):
+                if star not in seen_people:
+                    seen_people.add(star)
+                    discovered.append((star, movie, person))
+    return discovered
+
+
+def trace_path(person, parents):
+    """
+    Returns the (movie_id, person_id) pairs leading from the root of
+    `parents` to `person`.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, previous = parents[person]
+        path.append((movie_id_for_key(movie), person_id_for_key(person)))
+        person = previous
+    path.reverse()
+    return path
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Joins the forward and backward parent chains through `meeting`
+    into a list of (movie_id, person_id) pairs.
+    """
+    path = trace_path(meeting, forward)
+    person = meeting
+    while backward[person] is not None:
+        movie, person = backward[person]
+        path.append((movie_id_for_key(movie), person_id_for_key(person)))
+    return path
+
+
+def record(stats, frontier_size):
+    """
+    Updates search statistics with the current frontier size.
+    """
+    stats.setdefault("expanded", 0)
+    stats["max_frontier"] = max(stats.get("max_frontier", 0), frontier_size)
+
+
+def person_key(person_id):
+    """
+    Returns the key searches use for a person: the dense index when a
+    graph snapshot is loaded, otherwise the person_id itself.
+    """
+    if graph is not None:
+        return graph.person_index(person_id)
+    return person_id
+
+
+def person_id_for_key(key):
+    if graph is not None:
+        return graph.person_ids[key]
+    return key
+
+
+def movie_id_for_key(key):
+    if graph is not None:
+        return graph.movie_ids[key]
+    return key
+
+
+def person_movies(key):
+    """
+    Returns the movie keys a person (by key) starred in.
+    """
+    if graph is not None:
+        return graph.movies_of(key)
+    return people[key]["movies"]
+
+
+def movie_stars(key):
+    """
+    Returns the person keys who starred in a movie (by key).
+    """
+    if graph is not None:
+        return graph.stars_of(key)
+    return movies[key]["stars"]
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -157,11 +642,68 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def name_index():
+    """
+    Returns the NameIndex over the loaded names, building it if needed.
+    """
+    global names_index
+    if names_index is None:
+        if graph is not None:
+            entries = zip(graph.names.sorted_names,
+                          (graph.person_ids[p] for p in graph.name_order))
+        else:
+            entries = ((name, person_id)
+                       for name, person_ids in names.items()
+                       for person_id in person_ids)
+        names_index = NameIndex(entries)
+    return names_index
+
+
+def name_candidates(name, limit=10):
+    """
+    Returns up to `limit` ranked candidates for a name, as dicts of
+    person_id, name, birth and edit distance: exact matches first,
+    then names starting with `name`, then names with a typo or two.
+    """
+    candidates = []
+    for person_id, _, distance in name_index().search(name, limit):
+        person = people[person_id]
+        candidates.append({
+            "person_id": person_id,
+            "name": person["name"],
+            "birth": person["birth"],
+            "distance": distance
+        })
+    return candidates
+
+
+def resolve_name(name, birth=None):
+    """
+    Returns the IMDB id for a person's name without prompting, using
+    `birth` to choose between people who share the name.
+
+    Returns None if no one has the name, and raises LookupError if it
+    is still ambiguous.
+    """
+    person_ids = name_index().exact(name)
+    if birth is not None:
+        person_ids = [person_id for person_id in person_ids
+                      if people[person_id]["birth"] == str(birth)]
+    if len(person_ids) > 1:
+        raise LookupError(
+            f"ambiguous name {name!r}: {', '.join(sorted(person_ids))}"
+        )
+    return person_ids[0] if person_ids else None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors(person_id)
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -170,5 +712,15 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+# Search modes selectable from main()
+SEARCHES = {
+    "bfs": shortest_path,
+    "bidirectional": bidirectional_shortest_path,
+    "person": person_shortest_path,
+    "parallel": parallel_shortest_path,
+    "landmark": landmark_shortest_path,
+}
+
+
 if __name__ == "__main__":
     main()
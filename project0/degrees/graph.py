@@ -0,0 +1,422 @@
+"""
+Compact integer-indexed star graph for degrees.py.
+
+Person and movie ids are interned to dense integers (in sorted id order,
+so an id can be found again by binary search), and the person -> movie
+and movie -> person adjacency lists are stored as CSR-style arrays:
+`offsets[i]:offsets[i + 1]` is the slice of `targets` belonging to i.
+
+A graph can be saved as a binary snapshot and loaded back with mmap,
+in which case no data is parsed or copied until it is actually read.
+"""
+import bisect
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+import ingest
+
+MAGIC = b"DEGSNAP1"
+ALIGNMENT = 8
+
+HEADER = struct.Struct("<8sBI")
+SECTION = struct.Struct("<24scQQ")
+
+# Integer sections and their array typecodes
+ARRAY_SECTIONS = [
+    ("person_movie_offsets", "q"),
+    ("person_movie_targets", "i"),
+    ("movie_person_offsets", "q"),
+    ("movie_person_targets", "i"),
+    ("name_order", "i"),
+]
+
+# String tables, each stored as an offsets section and a bytes section
+STRING_SECTIONS = [
+    "person_ids",
+    "person_names",
+    "person_births",
+    "movie_ids",
+    "movie_titles",
+    "movie_years",
+]
+
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+
+class StringTable():
+    """
+    Immutable sequence of strings stored as one UTF-8 blob
+    plus an array of offsets into it.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array("q", [0])
+        blob = bytearray()
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        return cls(offsets, bytes(blob))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class Graph():
+    """
+    Bipartite person/movie graph stored as CSR adjacency arrays.
+    """
+
+    def __init__(self, arrays, strings):
+        for name, _ in ARRAY_SECTIONS:
+            setattr(self, name, arrays[name])
+
+        # Any sequence of strings will do here, e.g. a StringTable from
+        # a snapshot or a lazily loaded CSV column
+        for name in STRING_SECTIONS:
+            setattr(self, name, strings[name])
+
+        # Mapping views matching the dicts built by degrees.load_data
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+        self.names = NamesView(self)
+
+    @classmethod
+    def from_csv(cls, directory, stats=None):
+        """
+        Build a graph from the people.csv, movies.csv and stars.csv
+        files in `directory`. Birth years, titles and release years
+        are only read from the files when first accessed.
+        """
+        return cls.from_tables(ingest.read_tables(directory, stats))
+
+    @classmethod
+    def from_tables(cls, tables):
+        """
+        Build a graph from columnar ingest.Tables, whose people and
+        movies are sorted by id and whose stars are dense indices.
+        """
+        person_count = len(tables.person_ids)
+        movie_count = len(tables.movie_ids)
+
+        # Encode each edge as a single integer so duplicates collapse
+        # and sorting orders edges by person, then movie
+        edges = sorted(set(
+            p * movie_count + m
+            for p, m in zip(tables.star_people, tables.star_movies)
+        ))
+        sources = [edge // movie_count for edge in edges]
+        targets = [edge % movie_count for edge in edges]
+        del edges
+
+        person_movie_offsets, person_movie_targets = csr(
+            person_count, sources, targets
+        )
+        movie_person_offsets, movie_person_targets = csr(
+            movie_count, targets, sources
+        )
+
+        person_names = tables.person_names
+        name_order = array("i", sorted(
+            range(person_count), key=lambda i: person_names[i].lower()
+        ))
+
+        arrays = {
+            "person_movie_offsets": person_movie_offsets,
+            "person_movie_targets": person_movie_targets,
+            "movie_person_offsets": movie_person_offsets,
+            "movie_person_targets": movie_person_targets,
+            "name_order": name_order,
+        }
+        strings = {name: getattr(tables, name) for name in STRING_SECTIONS}
+        return cls(arrays, strings)
+
+    def save(self, path):
+        """
+        Write the graph to `path` as a binary snapshot.
+        """
+        sections = []
+        for name, typecode in ARRAY_SECTIONS:
+            sections.append((name, typecode, getattr(self, name)))
+        for name in STRING_SECTIONS:
+            table = getattr(self, name)
+            if not isinstance(table, StringTable):
+                table = StringTable.from_strings(table)
+            sections.append((f"{name}.offsets", "q", table.offsets))
+            sections.append((f"{name}.blob", "B", table.blob))
+
+        # Lay out sections after the header, each aligned for mmap casts
+        offset = align(HEADER.size + SECTION.size * len(sections))
+        entries = []
+        for name, typecode, data in sections:
+            data = memoryview(data).cast("B")
+            entries.append((name, typecode, offset, data))
+            offset = align(offset + len(data))
+
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, BYTE_ORDERS[sys.byteorder], len(entries)))
+            for name, typecode, offset, data in entries:
+                f.write(SECTION.pack(
+                    name.encode("ascii"), typecode.encode("ascii"),
+                    offset, len(data)
+                ))
+            for name, typecode, offset, data in entries:
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(data)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a snapshot written by `save`.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+
+        magic, byte_order, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a degrees snapshot")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f"{path} was written on a different byte order")
+
+        sections = {}
+        for i in range(count):
+            name, typecode, offset, size = SECTION.unpack_from(
+                buffer, HEADER.size + i * SECTION.size
+            )
+            name = name.rstrip(b"\0").decode("ascii")
+            sections[name] = view[offset:offset + size].cast(typecode.decode("ascii"))
+
+        arrays = {name: sections[name] for name, _ in ARRAY_SECTIONS}
+        strings = {
+            name: StringTable(sections[f"{name}.offsets"], sections[f"{name}.blob"])
+            for name in STRING_SECTIONS
+        }
+        return cls(arrays, strings)
+
+    @property
+    def person_count(self):
+        return len(self.person_ids)
+
+    @property
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if it is unknown.
+        """
+        return find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if it is unknown.
+        """
+        return find(self.movie_ids, movie_id)
+
+    def movies_of(self, p):
+        """
+        Returns the movie indices person index `p` starred in.
+        """
+        return self.person_movie_targets[
+            self.person_movie_offsets[p]:self.person_movie_offsets[p + 1]
+        ]
+
+    def stars_of(self, m):
+        """
+        Returns the person indices who starred in movie index `m`.
+        """
+        return self.movie_person_targets[
+            self.movie_person_offsets[m]:self.movie_person_offsets[m + 1]
+        ]
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        p = self.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        neighbors = set()
+        for m in self.movies_of(p):
+            movie_id = self.movie_ids[m]
+            for q in self.stars_of(m):
+                neighbors.add((movie_id, self.person_ids[q]))
+        return neighbors
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` mapping backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)}
+        }
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.person_count
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` mapping backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(m)}
+        }
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.movie_count
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` mapping (lowercase name -> set of person_ids)
+    backed by a Graph's name-sorted person order.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.sorted_names = SortedNames(graph)
+
+    def __getitem__(self, name):
+        graph = self.graph
+        i = bisect.bisect_left(self.sorted_names, name)
+        person_ids = set()
+        while i < len(self.sorted_names) and self.sorted_names[i] == name:
+            person_ids.add(graph.person_ids[graph.name_order[i]])
+            i += 1
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __contains__(self, name):
+        i = bisect.bisect_left(self.sorted_names, name)
+        return i < len(self.sorted_names) and self.sorted_names[i] == name
+
+    def __iter__(self):
+        previous = None
+        for name in self.sorted_names:
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class SortedNames():
+    """
+    Sequence of lowercase person names in `name_order`, for bisect.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __len__(self):
+        return len(self.graph.name_order)
+
+    def __getitem__(self, i):
+        graph = self.graph
+        return graph.person_names[graph.name_order[i]].lower()
+
+
+def csr(count, sources, targets):
+    """
+    Returns (offsets, targets) arrays for `count` rows, given parallel
+    lists of edge sources and targets.
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    position = array("q", offsets[:-1])
+    adjacency = array("i", bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        adjacency[position[source]] = target
+        position[source] += 1
+    return offsets, adjacency
+
+
+def find(values, value):
+    """
+    Returns the position of `value` in the sorted sequence `values`,
+    or None if it is not present.
+    """
+    i = bisect.bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        return i
+    return None
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python graph.py directory snapshot")
+    directory, snapshot = sys.argv[1:]
+
+    print("Loading data...")
+    graph = Graph.from_csv(directory)
+    graph.save(snapshot)
+    print(f"Saved {graph.person_count} people and "
+          f"{graph.movie_count} movies to {snapshot}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Streaming, columnar CSV ingestion for the degrees data files.
+
+Files are parsed in chunks of rows with csv.reader, keeping only the
+requested columns as lists. Display fields that searches never read
+(birth years, titles, release years) are not kept in memory at all
+until something asks for them, and stars rows that point at unknown
+ids are dropped by filtering mapped indices rather than by catching
+a KeyError per row.
+"""
+import csv
+import itertools
+import operator
+import sys
+import time
+from array import array
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Number of CSV rows parsed per chunk
+CHUNK_ROWS = 1 << 16
+
+
+def read_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    """
+    Yields, for each chunk of up to `chunk_rows` rows of the CSV file
+    at `path`, a list with one list of values per name in `columns`.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        getter = operator.itemgetter(*[header.index(column) for column in columns])
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                return
+            if len(columns) == 1:
+                yield [list(map(getter, rows))]
+            else:
+                yield [list(values) for values in zip(*map(getter, rows))]
+
+
+def read_columns(path, columns, chunk_rows=CHUNK_ROWS):
+    """
+    Returns one list of values per name in `columns` for the whole file.
+    """
+    result = [[] for _ in columns]
+    for chunk in read_chunks(path, columns, chunk_rows):
+        for values, chunk_values in zip(result, chunk):
+            values.extend(chunk_values)
+    return result
+
+
+class LazyColumn():
+    """
+    Read-only sequence of one CSV column, rearranged into `order`
+    (a list of file row numbers), that is only read from disk the
+    first time one of its values is needed.
+    """
+
+    def __init__(self, path, column, order):
+        self.path = path
+        self.column = column
+        self.order = order
+        self.cache = None
+
+    @property
+    def values(self):
+        if self.cache is None:
+            values, = read_columns(self.path, [self.column])
+            self.cache = [values[row] for row in self.order]
+        return self.cache
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class Tables():
+    """
+    Columnar contents of a degrees data directory. People and movies
+    are sorted by id, and stars hold dense indices into them.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 star_people, star_movies):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.star_people = star_people
+        self.star_movies = star_movies
+
+
+def sorted_rows(ids):
+    """
+    Returns the distinct `ids` in sorted order and, for each, the row
+    it was read from. Later rows win over earlier duplicates.
+    """
+    rows = dict(zip(ids, range(len(ids))))
+    ids = sorted(rows)
+    return ids, [rows[i] for i in ids]
+
+
+def read_tables(directory, stats=None, chunk_rows=CHUNK_ROWS):
+    """
+    Reads people.csv, movies.csv and stars.csv in `directory` into
+    Tables. If `stats` is a dict, it receives (rows, seconds) per file.
+    """
+    start = time.perf_counter()
+    people_path = f"{directory}/people.csv"
+    ids, names = read_columns(people_path, ["id", "name"], chunk_rows)
+    rows = len(ids)
+    person_ids, person_order = sorted_rows(ids)
+    person_names = [names[row] for row in person_order]
+    del ids, names
+    if stats is not None:
+        stats["people.csv"] = (rows, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    movies_path = f"{directory}/movies.csv"
+    ids, = read_columns(movies_path, ["id"], chunk_rows)
+    rows = len(ids)
+    movie_ids, movie_order = sorted_rows(ids)
+    del ids
+    if stats is not None:
+        stats["movies.csv"] = (rows, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    person_index = dict(zip(person_ids, range(len(person_ids))))
+    movie_index = dict(zip(movie_ids, range(len(movie_ids))))
+    star_people = array("i")
+    star_movies = array("i")
+    rows = 0
+    for person_column, movie_column in read_chunks(
+        f"{directory}/stars.csv", ["person_id", "movie_id"], chunk_rows
+    ):
+        rows += len(person_column)
+        pairs = [
+            (p, m) for p, m in zip(map(person_index.get, person_column),
+                                   map(movie_index.get, movie_column))
+            if p is not None and m is not None
+        ]
+        star_people.extend(p for p, _ in pairs)
+        star_movies.extend(m for _, m in pairs)
+    if stats is not None:
+        stats["stars.csv"] = (rows, time.perf_counter() - start)
+
+    return Tables(
+        person_ids, person_names,
+        LazyColumn(people_path, "birth", person_order),
+        movie_ids,
+        LazyColumn(movies_path, "title", movie_order),
+        LazyColumn(movies_path, "year", movie_order),
+        star_people, star_movies
+    )
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes,
+    or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python ingest.py directory")
+
+    stats = {}
+    read_tables(sys.argv[1], stats)
+    for filename, (rows, seconds) in stats.items():
+        rate = rows / seconds if seconds else float("inf")
+        print(f"{filename}: {rows} rows in {seconds:.3f}s ({rate:,.0f} rows/sec)")
+
+    peak = peak_rss()
+    if peak is not None:
+        print(f"Peak RSS: {peak / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
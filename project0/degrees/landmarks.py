@@ -0,0 +1,211 @@
+"""
+Landmark distance oracle for degrees.py.
+
+Breadth-first searches from k landmark people (the best-connected
+ones) give each person's degrees of separation from every landmark.
+By the triangle inequality, for any landmark L:
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the stored distances bound any distance instantly, and show when two
+people are not connected at all.
+
+Distances are stored one byte per person per landmark, with
+UNREACHABLE for people a landmark is not connected to and FAR for
+people at least FAR degrees away from it.
+"""
+import argparse
+import heapq
+import mmap
+import random
+import struct
+import time
+from array import array
+
+MAGIC = b"DEGLMK1\0"
+HEADER = struct.Struct("<8sII")
+UNREACHABLE = 255
+FAR = 254
+
+
+class Landmarks():
+
+    def __init__(self, people, distances):
+        """
+        `people` holds the landmarks' person indices and `distances`
+        one byte sequence of distances per landmark.
+        """
+        self.people = people
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Runs a breadth-first search from each of the `k` people with
+        the most co-star links in `graph`.
+        """
+        people = select(graph, k)
+        return cls(people, [distances_from(graph, p) for p in people])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            person_count = len(self.distances[0]) if self.distances else 0
+            f.write(HEADER.pack(MAGIC, len(self.people), person_count))
+            f.write(array("i", self.people).tobytes())
+            for distances in self.distances:
+                f.write(distances)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a landmark file written by `save`.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, k, person_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a degrees landmark file")
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+        people = list(array("i", view[offset:offset + 4 * k]))
+        offset += 4 * k
+        distances = []
+        for _ in range(k):
+            distances.append(view[offset:offset + person_count])
+            offset += person_count
+        return cls(people, distances)
+
+    @property
+    def person_count(self):
+        return len(self.distances[0]) if self.distances else 0
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between person indices `s` and `t`; `upper` is None if no
+        landmark reaches both. Returns (None, None) if the landmarks
+        show that `s` and `t` are not connected.
+        """
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            ds = distances[s]
+            dt = distances[t]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                return None, None
+            if ds == FAR or dt == FAR:
+                # Only known to be at least FAR, which bounds nothing
+                continue
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+
+def select(graph, k):
+    """
+    Returns the `k` person indices with the largest total cast size
+    over their movies, a cheap proxy for the number of co-stars.
+    """
+    def degree(p):
+        return sum(len(graph.stars_of(m)) for m in graph.movies_of(p))
+    return heapq.nlargest(k, range(graph.person_count), key=degree)
+
+
+def distances_from(graph, source):
+    """
+    Returns a bytearray of each person's degrees of separation from
+    person index `source`, capped at FAR, or UNREACHABLE for people not
+    connected to it.
+    """
+    distances = bytearray([UNREACHABLE]) * graph.person_count
+    distances[source] = 0
+    seen_movies = set()
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in graph.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for star in graph.stars_of(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = min(depth, FAR)
+                        next_frontier.append(star)
+        frontier = next_frontier
+    return distances
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute degrees landmarks.")
+    parser.add_argument("data", metavar="directory | snapshot")
+    parser.add_argument("output")
+    parser.add_argument("-k", type=int, default=16, help="number of landmarks")
+    parser.add_argument("--queries", type=int, default=100,
+                        help="random queries used to measure the speedup")
+    args = parser.parse_args()
+
+    import degrees
+    degrees.load(args.data, columnar=True)
+
+    start = time.perf_counter()
+    landmarks = Landmarks.build(degrees.graph, args.k)
+    landmarks.save(args.output)
+    elapsed = time.perf_counter() - start
+    size = HEADER.size + 4 * args.k + args.k * degrees.graph.person_count
+    print(f"Precomputed {args.k} landmarks in {elapsed:.2f}s, "
+          f"index size {size / 2 ** 20:.2f} MiB")
+
+    # Compare exact BFS, the landmark-checked search and the instant bounds
+    degrees.landmarks = landmarks
+    rng = random.Random(0)
+    people = [p for p in range(degrees.graph.person_count)
+              if len(degrees.graph.movies_of(p))]
+    pairs = [(degrees.graph.person_ids[rng.choice(people)],
+              degrees.graph.person_ids[rng.choice(people)])
+             for _ in range(args.queries)]
+
+    timings = {}
+    lengths = {}
+    for mode in ["person", "bidirectional", "landmark"]:
+        start = time.perf_counter()
+        for source, target in pairs:
+            path = degrees.SEARCHES[mode](source, target)
+            length = None if path is None else len(path)
+            if lengths.setdefault((source, target), length) != length:
+                raise RuntimeError(
+                    f"{mode} found {length} degrees from {source} to {target}, "
+                    f"expected {lengths[(source, target)]}"
+                )
+        timings[mode] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bounds = [degrees.estimate_degrees(source, target) for source, target in pairs]
+    timings["bounds"] = time.perf_counter() - start
+
+    # The bounds must hold, and must never disconnect connected people
+    exact = 0
+    for (source, target), (lower, upper) in zip(pairs, bounds):
+        length = lengths[(source, target)]
+        if length is not None and (lower is None or length < lower
+                                   or upper is not None and length > upper):
+            raise RuntimeError(
+                f"bounds ({lower}, {upper}) from {source} to {target} "
+                f"do not hold for {length} degrees"
+            )
+        exact += lower is not None and lower == upper
+
+    for mode, seconds in timings.items():
+        print(f"    {mode:<16}{seconds / len(pairs) * 1000:>10.3f} ms/query"
+              f"{timings['person'] / seconds:>10.1f}x")
+    print(f"    bounds were exact for {exact} of {len(pairs)} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Prefix and typo-tolerant lookup over lowercase person names.
+
+Distinct names are kept sorted, so a prefix is a bisected range, and an
+inverted index of character trigrams narrows fuzzy queries down to the
+few names that share enough trigrams with the query before any edit
+distance is computed.
+"""
+import bisect
+from array import array
+
+# Fuzzy candidates are not considered past this edit distance by default
+MAX_DISTANCE = 2
+
+
+class NameIndex():
+
+    def __init__(self, entries):
+        """
+        Builds the index from (lowercase name, person_id) pairs.
+        """
+        grouped = {}
+        for name, person_id in entries:
+            grouped.setdefault(name, []).append(person_id)
+        self.keys = sorted(grouped)
+        self.person_ids = [grouped[name] for name in self.keys]
+
+        postings = {}
+        lengths = {}
+        for i, name in enumerate(self.keys):
+            for gram in set(trigrams(name)):
+                postings.setdefault(gram, array("i")).append(i)
+            lengths.setdefault(len(name), array("i")).append(i)
+        self.postings = postings
+        self.lengths = lengths
+
+    def exact(self, name):
+        """
+        Returns the person_ids whose name is exactly `name`.
+        """
+        name = name.lower()
+        i = bisect.bisect_left(self.keys, name)
+        if i < len(self.keys) and self.keys[i] == name:
+            return list(self.person_ids[i])
+        return []
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` (name, person_ids) pairs for names
+        starting with `prefix`, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        matches = []
+        for i in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[i].startswith(prefix):
+                break
+            matches.append((self.keys[i], self.person_ids[i]))
+        return matches
+
+    def fuzzy(self, query, max_distance=MAX_DISTANCE, limit=10):
+        """
+        Returns up to `limit` (distance, name, person_ids) triples for
+        the names closest to `query`, within `max_distance` edits.
+
+        The allowed distance is widened one edit at a time and the search
+        stops at the first distance with any matches, since the trigram
+        filter is much tighter for small distances. Queries too short for
+        the trigram filter scan every name of a length within reach.
+        """
+        query = query.lower()
+        grams = sorted(set(trigrams(query)),
+                       key=lambda gram: len(self.postings.get(gram, ())))
+        masks = pattern_masks(query)
+
+        matches = []
+        for distance in range(1, max_distance + 1):
+            # Each edit can destroy at most three of the query's trigrams,
+            # so a match shares at least `needed` of them and must contain
+            # one of the rarest len(grams) - needed + 1. If `needed` is not
+            # positive, a match may share none, so names are only filtered
+            # by their length.
+            needed = len(grams) - 3 * distance
+            candidates = set()
+            if needed > 0:
+                for gram in grams[:len(grams) - needed + 1]:
+                    candidates.update(self.postings.get(gram, ()))
+            else:
+                for length in range(len(query) - distance, len(query) + distance + 1):
+                    candidates.update(self.lengths.get(length, ()))
+
+            matches = []
+            for i in candidates:
+                name = self.keys[i]
+                if abs(len(name) - len(query)) > distance:
+                    continue
+                d = edit_distance(query, name, distance, masks)
+                if d is not None:
+                    matches.append((d, name, self.person_ids[i]))
+            if matches:
+                break
+        matches.sort(key=lambda match: (match[0], match[1]))
+        return matches[:limit]
+
+    def search(self, query, limit=10, max_distance=MAX_DISTANCE):
+        """
+        Returns up to `limit` ranked (person_id, name, distance) triples:
+        exact matches, then prefix matches, then fuzzy matches.
+        """
+        results = []
+        seen = set()
+
+        def add(name, person_ids, distance):
+            for person_id in person_ids:
+                if person_id not in seen and len(results) < limit:
+                    seen.add(person_id)
+                    results.append((person_id, name, distance))
+
+        add(query.lower(), self.exact(query), 0)
+        for name, person_ids in self.prefix(query, limit):
+            add(name, person_ids, len(name) - len(query))
+        if len(results) < limit:
+            for distance, name, person_ids in self.fuzzy(query, max_distance, limit):
+                add(name, person_ids, distance)
+        return results
+
+
+def trigrams(name):
+    """
+    Returns the character trigrams of `name`, padded at both ends.
+    """
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, max_distance, masks=None):
+    """
+    Returns the Levenshtein distance between `a` and `b`, or None if
+    it exceeds `max_distance`.
+
+    Uses Myers' bit-parallel algorithm (in Hyyrö's formulation for
+    whole-string distance): one column of the DP table is held as bit
+    vectors in Python ints, so each character of `b` costs a handful of
+    integer operations. `masks` may carry pattern_masks(a) when `a` is
+    compared against many strings.
+    """
+    m = len(a)
+    if m == 0:
+        return len(b) if len(b) <= max_distance else None
+    if masks is None:
+        masks = pattern_masks(a)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    positive = full
+    negative = 0
+    score = m
+    for c in b:
+        eq = masks.get(c, 0)
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        horizontal_positive = negative | ~(xh | positive)
+        horizontal_negative = positive & xh
+        if horizontal_positive & last:
+            score += 1
+        elif horizontal_negative & last:
+            score -= 1
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative <<= 1
+        positive = (horizontal_negative | ~(xv | horizontal_positive)) & full
+        negative = horizontal_positive & xv & full
+    return score if score <= max_distance else None
+
+
+def pattern_masks(a):
+    """
+    Returns, for each character of `a`, a bitmask of its positions.
+    """
+    masks = {}
+    for i, c in enumerate(a):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
@@ -0,0 +1,90 @@
+"""
+Synthetic star graphs in the degrees people/movies/stars CSV format.
+
+Every movie gets a cast drawn from all people, either uniformly or
+with Zipf-distributed popularity so that a few hub actors appear in
+many movies, as in the real IMDb data.
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+
+DISTRIBUTIONS = ["uniform", "zipf"]
+
+
+def generate(directory, people=10000, movies=2000, cast=5,
+             distribution="zipf", exponent=1.0, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv to `directory`.
+
+    Each movie has between 1 and 2 * `cast` - 1 stars (`cast` on
+    average). With the "zipf" distribution, the person of popularity
+    rank r is picked with probability proportional to 1 / r ** exponent.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Ids are shuffled so popularity does not follow id order
+    person_ids = rng.sample(range(1, 100 * people + 1), people)
+    movie_ids = rng.sample(range(1, 100 * movies + 1), movies)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i, person_id in enumerate(person_ids):
+            writer.writerow([person_id, f"Person {i}", rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i, movie_id in enumerate(movie_ids):
+            writer.writerow([movie_id, f"Movie {i}", rng.randint(1920, 2020)])
+
+    if distribution == "zipf":
+        weights = itertools.accumulate(1 / r ** exponent for r in range(1, people + 1))
+        cumulative = list(weights)
+
+        def pick():
+            point = rng.random() * cumulative[-1]
+            return person_ids[bisect.bisect_left(cumulative, point)]
+    elif distribution == "uniform":
+        def pick():
+            return rng.choice(person_ids)
+    else:
+        raise ValueError(f"unknown distribution {distribution!r}")
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id in movie_ids:
+            for _ in range(rng.randint(1, 2 * cast - 1)):
+                writer.writerow([pick(), movie_id])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic degrees dataset.")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=10000)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--cast", type=int, default=5,
+                        help="average number of stars per movie")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="zipf")
+    parser.add_argument("--exponent", type=float, default=1.0,
+                        help="Zipf exponent of actor popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.directory, args.people, args.movies, args.cast,
+             args.distribution, args.exponent, args.seed)
+    print(f"Generated {args.people} people and {args.movies} movies "
+          f"in {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Bitboard Tic Tac Toe backend
+
+Stores X's and O's cells as two 9-bit integers, cell (i, j) being bit
+3 * i + j. Wins are found by table lookup (precomputed from the 8 line
+masks), and the search passes the two integers down the recursion
+instead of copying boards.
+
+The module offers the same initial_state/player/actions/result/winner/
+terminal/utility/minimax API as tictactoe.py, on BitBoard objects that
+can be indexed like the list-of-lists board, so `import bitboard as
+ttt` works in runner.py.
+"""
+import sys
+import time
+
+import tictactoe
+from tictactoe import X, O, EMPTY
+
+FULL = 0b111111111
+
+# The 8 winning lines: rows, columns and diagonals
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# WON[bits] is True if the cells in `bits` contain a full line
+WON = [any(bits & line == line for line in LINES) for bits in range(1 << 9)]
+
+# Cell bits in the same order tictactoe.MOVE_ORDER tries moves
+ORDER = [1 << (3 * i + j) for (i, j) in tictactoe.MOVE_ORDER]
+
+# Search instrumentation, see reset_stats()
+stats = {"nodes": 0}
+
+
+class BitBoard():
+    """
+    Immutable board of two bitmasks that can be read as board[i][j].
+    """
+    __slots__ = ("x", "o")
+
+    def __init__(self, x=0, o=0):
+        self.x = x
+        self.o = o
+
+    def __getitem__(self, i):
+        return tuple(self.cell(i, j) for j in range(3))
+
+    def cell(self, i, j):
+        bit = 1 << (3 * i + j)
+        if self.x & bit:
+            return X
+        if self.o & bit:
+            return O
+        return EMPTY
+
+    def __eq__(self, other):
+        return (isinstance(other, BitBoard)
+                and self.x == other.x and self.o == other.o)
+
+    def __hash__(self):
+        return hash((self.x, self.o))
+
+    def __repr__(self):
+        return f"BitBoard({self.x:#011b}, {self.o:#011b})"
+
+
+def from_board(board):
+    """
+    Returns a BitBoard for a list-of-lists board (or a BitBoard).
+    """
+    if isinstance(board, BitBoard):
+        return board
+    x = 0
+    o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return BitBoard(x, o)
+
+
+def to_board(board):
+    """
+    Returns the list-of-lists board for a BitBoard.
+    """
+    return [list(board[i]) for i in range(3)]
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return BitBoard()
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    board = from_board(board)
+    if bin(board.x).count("1") > bin(board.o).count("1"):
+        return O
+    return X
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    board = from_board(board)
+    occupied = board.x | board.o
+    return {divmod(cell, 3) for cell in range(9) if not occupied & (1 << cell)}
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    board = from_board(board)
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise Exception("invalid move")
+    bit = 1 << (3 * i + j)
+    if (board.x | board.o) & bit:
+        raise Exception("invalid move")
+    if player(board) == X:
+        return BitBoard(board.x | bit, board.o)
+    return BitBoard(board.x, board.o | bit)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    board = from_board(board)
+    if WON[board.x]:
+        return X
+    if WON[board.o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    board = from_board(board)
+    return WON[board.x] or WON[board.o] or (board.x | board.o) == FULL
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    board = from_board(board)
+    if WON[board.x]:
+        return 1
+    if WON[board.o]:
+        return -1
+    return 0
+
+
+def reset_stats():
+    """
+    Resets the search counters in `stats`.
+    """
+    stats["nodes"] = 0
+
+
+def negamax(me, them, alpha, beta):
+    """
+    Returns the value of a position for the player to move, whose
+    cells are `me`, against the opponent's cells `them`: 1 for a win,
+    0 for a draw and -1 for a loss, with alpha-beta pruning.
+    """
+    stats["nodes"] += 1
+
+    # Only the player who just moved can have completed a line
+    if WON[them]:
+        return -1
+    occupied = me | them
+    if occupied == FULL:
+        return 0
+
+    best = -1
+    for bit in ORDER:
+        if occupied & bit:
+            continue
+        value = -negamax(them, me | bit, -beta, -alpha)
+        if value > best:
+            best = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+    return best
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    board = from_board(board)
+    if terminal(board):
+        return None
+
+    if player(board) == X:
+        me, them = board.x, board.o
+    else:
+        me, them = board.o, board.x
+
+    occupied = me | them
+    best_value = -2
+    best_bit = None
+    for bit in ORDER:
+        if occupied & bit:
+            continue
+        value = -negamax(them, me | bit, -1, -best_value)
+        if value > best_value:
+            best_value = value
+            best_bit = bit
+            if value == 1:
+                break
+    return divmod(best_bit.bit_length() - 1, 3)
+
+
+def main():
+    """
+    Micro-benchmark: alpha-beta nodes/sec for the list-of-lists board
+    in tictactoe.py against this bitboard, from a few positions.
+    """
+    positions = [("empty board", tictactoe.initial_state())]
+    board = tictactoe.result(tictactoe.initial_state(), (0, 0))
+    positions.append(("X in a corner", board))
+
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    for name, board in positions:
+        print(name)
+        for label, search, reset, counters in [
+            ("list", lambda: tictactoe.minimax(board, "alphabeta"),
+             tictactoe.reset_stats, tictactoe.stats),
+            ("bitboard", lambda: minimax(from_board(board)),
+             reset_stats, stats),
+        ]:
+            reset()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                move = search()
+            seconds = time.perf_counter() - start
+            nodes = counters["nodes"]
+            print(f"    {label:<10}{nodes:>10} nodes {seconds:>9.4f}s "
+                  f"{nodes / seconds:>12,.0f} nodes/sec  move {move}")
+
+
+if __name__ == "__main__":
+    main()
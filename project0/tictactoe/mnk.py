@@ -0,0 +1,397 @@
+"""
+m,n,k-games: Tic Tac Toe generalized to an m x n board on which k marks
+in a row, column or diagonal win (4,4,4 or Gomoku's 15,15,5).
+
+Full minimax is out of reach on these boards, so search() runs
+iterative-deepening alpha-beta within a time budget. Positions at the
+depth limit are scored by the lines still open to each player, and the
+best move of the deepest completed iteration is played.
+
+Boards are lists of lists of X, O and EMPTY as in tictactoe.py, and
+Game offers the same initial_state/player/actions/result/winner/
+terminal/utility/minimax API.
+"""
+import argparse
+import math
+import sys
+import time
+
+import tictactoe as ttt
+from tictactoe import X, O, EMPTY
+
+# Directions a line can run in: along a row, a column and both diagonals
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# The search only tries empty cells within this distance of a mark
+NEIGHBORHOOD = 1
+
+# Boards of at most this many cells are searched on every empty cell
+SMALL_BOARD = 16
+
+
+class Timeout(Exception):
+    """
+    Raised inside the search when its time budget has run out.
+    """
+
+
+class Game():
+
+    def __init__(self, m=3, n=3, k=3):
+        if m < 1 or n < 1 or not 1 <= k <= max(m, n):
+            raise ValueError(f"invalid m,n,k-game {m},{n},{k}")
+        self.m = m
+        self.n = n
+        self.k = k
+
+        # Every run of k cells, and the runs through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in DIRECTIONS:
+                    end_i = i + (k - 1) * di
+                    end_j = j + (k - 1) * dj
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append([(i + s * di, j + s * dj) for s in range(k)])
+        self.lines_at = {(i, j): [] for i in range(m) for j in range(n)}
+        for index, line in enumerate(self.lines):
+            for cell in line:
+                self.lines_at[cell].append(index)
+
+        # Cells from the center outwards, the order moves are tried in
+        self.cells = sorted(self.lines_at, key=lambda cell: (
+            abs(cell[0] - (m - 1) / 2) + abs(cell[1] - (n - 1) / 2), cell))
+
+        # Score of a win, above any heuristic score
+        self.win = 10 ** k * (len(self.lines) + 1)
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        count_x = sum(row.count(X) for row in board)
+        count_o = sum(row.count(O) for row in board)
+        return O if count_x > count_o else X
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for (i, j) in self.lines_at if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n) or board[i][j] != EMPTY:
+            raise Exception("invalid move")
+        new_board = [list(row) for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        for line in self.lines:
+            first = board[line[0][0]][line[0][1]]
+            if first != EMPTY and all(board[i][j] == first for i, j in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        if self.winner(board) is not None:
+            return True
+        return all(cell != EMPTY for row in board for cell in row)
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        return {X: 1, O: -1, None: 0}[self.winner(board)]
+
+    def evaluate(self, board):
+        """
+        Returns the heuristic score of the board for X: every line that
+        holds c marks of only one player counts 10 ** c for that player.
+        """
+        return Search(self, board).score
+
+    def minimax(self, board, budget=1.0):
+        """
+        Returns the best action found for the current player on the
+        board within `budget` seconds.
+        """
+        return search(self, board, budget)[0]
+
+
+class Search():
+    """
+    Board being searched, with each line's mark counts and the
+    heuristic score kept up to date as moves are made and unmade.
+    """
+
+    def __init__(self, game, board, deadline=math.inf, stop=None):
+        self.game = game
+        self.board = [list(row) for row in board]
+        self.deadline = deadline
+        self.stop = stop
+        self.nodes = 0
+        self.counts = {X: [0] * len(game.lines), O: [0] * len(game.lines)}
+        self.score = 0
+        self.marks = []
+
+        # Whether to try every empty cell rather than those near a mark
+        self.full = len(game.cells) <= SMALL_BOARD
+
+        for i, j in game.cells:
+            mark = self.board[i][j]
+            if mark != EMPTY:
+                self.board[i][j] = EMPTY
+                self.place(i, j, mark)
+
+    def place(self, i, j, mark):
+        """
+        Puts `mark` on cell (i, j) and returns True if it wins.
+        """
+        own = self.counts[mark]
+        other = self.counts[X if mark == O else O]
+        sign = 1 if mark == X else -1
+        won = False
+        for line in self.game.lines_at[(i, j)]:
+            if other[line]:
+                # The line was open to the other player only, now to no one
+                if not own[line]:
+                    self.score += sign * 10 ** other[line]
+            else:
+                self.score += sign * growth(own[line])
+            own[line] += 1
+            if own[line] == self.game.k:
+                won = True
+        self.board[i][j] = mark
+        self.marks.append((i, j))
+        return won
+
+    def remove(self, i, j, mark):
+        """
+        Undoes place(i, j, mark).
+        """
+        own = self.counts[mark]
+        other = self.counts[X if mark == O else O]
+        sign = 1 if mark == X else -1
+        for line in self.game.lines_at[(i, j)]:
+            own[line] -= 1
+            if other[line]:
+                if not own[line]:
+                    self.score -= sign * 10 ** other[line]
+            else:
+                self.score -= sign * growth(own[line])
+        self.board[i][j] = EMPTY
+        self.marks.pop()
+
+    def candidates(self):
+        """
+        Returns the empty cells to try, center first: all of them if
+        `full` is set, else those near a mark.
+        """
+        if self.full:
+            return [(i, j) for (i, j) in self.game.cells if self.board[i][j] == EMPTY]
+        if not self.marks:
+            return self.game.cells[:1]
+        near = set()
+        for i, j in self.marks:
+            for di in range(-NEIGHBORHOOD, NEIGHBORHOOD + 1):
+                for dj in range(-NEIGHBORHOOD, NEIGHBORHOOD + 1):
+                    near.add((i + di, j + dj))
+        return [(i, j) for (i, j) in self.game.cells
+                if (i, j) in near and self.board[i][j] == EMPTY]
+
+    def negamax(self, depth, alpha, beta, mark):
+        """
+        Returns the score of the position for `mark`, the player to
+        move, searching `depth` moves ahead with alpha-beta pruning.
+        """
+        self.nodes += 1
+        if self.nodes % 1024 == 0:
+            if time.perf_counter() > self.deadline:
+                raise Timeout
+            if self.stop is not None and self.stop.is_set():
+                raise Timeout
+
+        sign = 1 if mark == X else -1
+        if depth == 0 or len(self.marks) == len(self.game.cells):
+            return sign * self.score
+
+        opponent = O if mark == X else X
+        best = -math.inf
+        for i, j in self.candidates():
+            if self.place(i, j, mark):
+                # Prefer quicker wins
+                value = self.game.win - len(self.marks)
+            else:
+                value = -self.negamax(depth - 1, -beta, -alpha, opponent)
+            self.remove(i, j, mark)
+            if value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        return best
+
+
+def growth(count):
+    """
+    Returns how much a line open to one player only gains for that
+    player when their `count` marks on it become count + 1.
+    """
+    return 10 ** (count + 1) - (10 ** count if count else 0)
+
+
+def search(game, board, budget=1.0, max_depth=None, stop=None, progress=None):
+    """
+    Returns (action, info) for the current player on the board, where
+    `action` is the best move of the deepest alpha-beta search that
+    finished within `budget` seconds and `info` reports the depth
+    reached, nodes searched, nodes/sec and the move's score.
+
+    The search also ends early once the threading.Event `stop` is set,
+    and calls progress(action, info) after every completed depth.
+    """
+    start = time.perf_counter()
+    info = {"depth": 0, "nodes": 0, "seconds": 0.0, "nodes_per_sec": 0.0, "score": None}
+    if game.terminal(board):
+        return None, info
+
+    state = Search(game, board, start + budget, stop)
+    mark = game.player(board)
+    opponent = O if mark == X else X
+    moves = state.candidates()
+    remaining = len(game.cells) - len(state.marks)
+    limit = remaining if max_depth is None else min(max_depth, remaining)
+
+    best = moves[0]
+    for depth in range(1, limit + 1):
+        if depth == remaining and not state.full:
+            # A search to the end of the game tries every move, so that
+            # its result is exact
+            state.full = True
+            moves += [move for move in state.candidates() if move not in moves]
+        try:
+            scores = {}
+            alpha = -math.inf
+            for i, j in moves:
+                if state.place(i, j, mark):
+                    value = game.win - len(state.marks)
+                else:
+                    value = -state.negamax(depth - 1, -math.inf, -alpha, opponent)
+                state.remove(i, j, mark)
+                scores[(i, j)] = value
+                alpha = max(alpha, value)
+        except Timeout:
+            break
+
+        # Search the best moves first in the next iteration
+        moves.sort(key=lambda move: -scores[move])
+        best = moves[0]
+        info["depth"] = depth
+        info["score"] = scores[best]
+        if progress is not None:
+            info["nodes"] = state.nodes
+            progress(best, dict(info))
+        if abs(scores[best]) >= game.win - len(game.cells):
+            # A forced win or loss has been found
+            break
+
+    info["nodes"] = state.nodes
+    info["seconds"] = time.perf_counter() - start
+    info["nodes_per_sec"] = state.nodes / info["seconds"] if info["seconds"] else 0.0
+    return best, info
+
+
+def check(budget=10.0):
+    """
+    Searches every reachable position of the 3,3,3-game and returns the
+    positions where search() disagrees with tictactoe.py's exact
+    minimax: it plays a move of a worse value, or does not report the
+    forced win or loss of a decided position.
+    """
+    game = Game(3, 3, 3)
+    failures = []
+    seen = set()
+    boards = [ttt.initial_state()]
+    while boards:
+        board = boards.pop()
+        if ttt.terminal(board):
+            continue
+        for action in ttt.actions(board):
+            child = ttt.result(board, action)
+            key = tuple(map(tuple, child))
+            if key not in seen:
+                seen.add(key)
+                boards.append(child)
+
+        # Values are for the player to move
+        sign = 1 if ttt.player(board) == X else -1
+        value = sign * ttt.memo_value(board)
+        move, info = search(game, board, budget)
+        played = sign * ttt.memo_value(ttt.result(board, move))
+        reported = 0
+        if abs(info["score"]) >= game.win - len(game.cells):
+            reported = 1 if info["score"] > 0 else -1
+        if played != value or reported != value:
+            failures.append((board, move, info))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play an m,n,k-game.")
+    parser.add_argument("m", type=int, nargs="?", default=3, help="rows")
+    parser.add_argument("n", type=int, nargs="?", default=3, help="columns")
+    parser.add_argument("k", type=int, nargs="?", default=3, help="marks in a row to win")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds of search per move")
+    parser.add_argument("--moves", type=int, help="stop after this many moves")
+    parser.add_argument("--check", action="store_true",
+                        help="compare the 3,3,3-game with tictactoe.py's minimax and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check()
+        for board, move, info in failures:
+            print(f"{board}: played {move}, score {info['score']}")
+        if failures:
+            sys.exit(f"{len(failures)} positions disagree with tictactoe.minimax")
+        print("All positions agree with tictactoe.minimax")
+        return
+
+    game = Game(args.m, args.n, args.k)
+    board = game.initial_state()
+    played = 0
+    while not game.terminal(board) and (args.moves is None or played < args.moves):
+        mark = game.player(board)
+        move, info = search(game, board, args.budget)
+        board = game.result(board, move)
+        played += 1
+        print(f"{played:>3}. {mark} {move}  depth {info['depth']:>2}  "
+              f"{info['nodes']:>9} nodes  {info['nodes_per_sec']:>10,.0f} nodes/sec  "
+              f"score {info['score']}")
+
+    for row in board:
+        print(" ".join(cell or "." for cell in row))
+    winner = game.winner(board)
+    print(f"Winner: {winner}" if winner else "No winner")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import mnk
 import tictactoe as ttt
 
+# Usage: python runner.py [m n k [budget]] plays an m,n,k-game instead
+# of Tic Tac Toe, the computer searching `budget` seconds per move
+if len(sys.argv) not in [1, 4, 5]:
+    sys.exit("Usage: python runner.py [m n k [budget]]")
+if len(sys.argv) > 1:
+    game = mnk.Game(*(int(arg) for arg in sys.argv[1:4]))
+    budget = float(sys.argv[4]) if len(sys.argv) == 5 else 1.0
+    rows, columns = game.m, game.n
+else:
+    game = ttt
+    rows, columns = 3, 3
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,16 +30,55 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+progressFont = pygame.font.Font("OpenSans-Regular.ttf", 20)
+tile_size = min(80, 240 // max(rows, columns))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+clock = pygame.time.Clock()
+
+# The computer searches in a background thread so that the window keeps
+# drawing and handling events; the loop polls the search's future each
+# frame, and resetting the board sets `cancel` to abandon the search
+executor = ThreadPoolExecutor(max_workers=1)
+search = None
+search_started = None
+cancel = None
+progress = {}
+
+
+def think(board, cancel, progress):
+    """
+    Returns the computer's move on the board, recording the best move
+    so far in `progress` as a deeper search completes.
+    """
+    if game is ttt:
+        return ttt.minimax(board)
+
+    def report(move, info):
+        progress.update(info, move=move)
+
+    return mnk.search(game, board, budget, stop=cancel, progress=report)[0]
+
+
+def stop_search():
+    """
+    Cancels the computer's search, if one is running.
+    """
+    global search
+    if search is not None:
+        cancel.set()
+        search.cancel()
+        search = None
+
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = game.initial_state()
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            stop_search()
+            executor.shutdown(wait=False)
             sys.exit()
 
     screen.fill(black)
@@ -67,19 +121,18 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
                     tile_size, tile_size
                 )
-                pygame.draw.rect(screen, white, rect, 3)
+                pygame.draw.rect(screen, white, rect, 3 if tile_size > 20 else 1)
 
                 if board[i][j] != ttt.EMPTY:
                     move = moveFont.render(board[i][j], True, white)
@@ -89,12 +142,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -108,39 +161,54 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Show the search's progress
+        if search is not None and progress:
+            text = (f"Depth {progress['depth']}, best move {progress['move']}, "
+                    f"{progress['nodes']} nodes")
+            text = progressFont.render(text, True, white)
+            textRect = text.get_rect()
+            textRect.center = ((width / 2), 65)
+            screen.blit(text, textRect)
+
+        # Check for AI move, played no sooner than half a second after
+        # the search started
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if search is None:
+                cancel = threading.Event()
+                progress = {}
+                search = executor.submit(think, board, cancel, progress)
+                search_started = time.time()
+            elif search.done() and time.time() - search_started >= 0.5:
+                move = search.result()
+                search = None
+                board = game.result(board, move)
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
-
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                        board = game.result(board, (i, j))
+
+        # Offer to play again once the game is over, or to reset the
+        # board (abandoning the computer's search) while it is in progress
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        label = "Play Again" if game_over else "Reset"
+        again = mediumFont.render(label, True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                stop_search()
+                user = None
+                board = game.initial_state()
 
     pygame.display.flip()
+    clock.tick(30)
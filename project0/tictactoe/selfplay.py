@@ -0,0 +1,161 @@
+"""
+Headless self-play and position analysis for tictactoe.py.
+
+    python selfplay.py play [--games N] [--engine E] [--opponent E|random]
+    python selfplay.py analyze positions.txt
+
+`play` runs N games between two engines (or an engine and a random
+player, the engine taking X and O in turn) in parallel worker
+processes, and reports the results with games/sec and positions/sec.
+
+`analyze` reads one position per line as 9 cells, row by row, written
+X, O, or . (or _) for an empty cell, and writes one JSON line per
+position with its best move and minimax value (1 if X wins with best
+play, -1 if O does, 0 for a draw).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import bitboard
+import tictactoe as ttt
+
+ENGINES = sorted(ttt.ENGINES) + ["bitboard", "minimax"]
+CELLS = {"X": ttt.X, "O": ttt.O, ".": ttt.EMPTY, "_": ttt.EMPTY}
+
+
+def choose(engine, board, rng):
+    """
+    Returns the move `engine` plays on the board: "random" for a
+    uniformly random move, "bitboard" for bitboard.minimax, or any
+    engine of tictactoe.minimax.
+    """
+    if engine == "random":
+        return rng.choice(sorted(ttt.actions(board)))
+    if engine == "bitboard":
+        return bitboard.minimax(board)
+    return ttt.minimax(board, engine)
+
+
+def play(game):
+    """
+    Plays one game from (index, x_engine, o_engine, seed) and returns
+    its winner (None for a tie) and number of moves.
+    """
+    index, x_engine, o_engine, seed = game
+    rng = random.Random(f"{seed}-{index}")
+    board = ttt.initial_state()
+    moves = 0
+    while not ttt.terminal(board):
+        engine = x_engine if ttt.player(board) == ttt.X else o_engine
+        board = ttt.result(board, choose(engine, board, rng))
+        moves += 1
+    return ttt.winner(board), moves
+
+
+def parse(line):
+    """
+    Returns the board written on a line of an analysis file.
+    """
+    cells = "".join(line.split())
+    if len(cells) != 9 or any(cell not in CELLS for cell in cells):
+        raise ValueError(f"invalid position {line.strip()!r}")
+    board = [[CELLS[cell] for cell in cells[i:i + 3]] for i in range(0, 9, 3)]
+    count_x = cells.count("X")
+    count_o = cells.count("O")
+    if not 0 <= count_x - count_o <= 1:
+        raise ValueError(f"unreachable position {line.strip()!r}")
+    return board
+
+
+def analyze(task):
+    """
+    Returns the JSON-serializable analysis of one position from
+    (line, engine).
+    """
+    line, engine = task
+    result = {"position": line.strip()}
+    try:
+        board = parse(line)
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+    move = choose(engine, board, None)
+    result["move"] = None if move is None else list(move)
+    result["value"] = ttt.memo_value(board)
+    return result
+
+
+def run(function, tasks, workers):
+    """
+    Yields function(task) for each task, in order, computed by
+    `workers` processes (in this process if `workers` is 1).
+    """
+    if workers <= 1:
+        yield from map(function, tasks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(function, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the tictactoe engines headlessly.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play_parser = commands.add_parser("play", help="play engine games")
+    play_parser.add_argument("--games", type=int, default=100)
+    play_parser.add_argument("--engine", choices=ENGINES, default="table")
+    play_parser.add_argument("--opponent", choices=ENGINES + ["random"], default="random")
+    play_parser.add_argument("--seed", type=int, default=0)
+
+    analyze_parser = commands.add_parser("analyze", help="analyze positions")
+    analyze_parser.add_argument("positions", nargs="?", default="-",
+                                help="file of positions, one per line (default: stdin)")
+    analyze_parser.add_argument("--engine", choices=ENGINES, default="table")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "play":
+        # The engine alternates between X and O
+        games = []
+        for index in range(args.games):
+            if index % 2 == 0:
+                games.append((index, args.engine, args.opponent, args.seed))
+            else:
+                games.append((index, args.opponent, args.engine, args.seed))
+
+        results = {"engine": 0, "opponent": 0, "tie": 0}
+        positions = 0
+        for index, (winner, moves) in enumerate(run(play, games, args.workers)):
+            positions += moves
+            if winner is None:
+                results["tie"] += 1
+            elif winner == (ttt.X if index % 2 == 0 else ttt.O):
+                results["engine"] += 1
+            else:
+                results["opponent"] += 1
+        seconds = time.perf_counter() - start
+        print(f"{args.engine} vs {args.opponent}: {results['engine']} wins, "
+              f"{results['opponent']} losses, {results['tie']} ties")
+        print(f"{args.games} games, {positions} positions in {seconds:.3f}s: "
+              f"{args.games / seconds:,.1f} games/sec, {positions / seconds:,.0f} positions/sec")
+
+    else:
+        f = sys.stdin if args.positions == "-" else open(args.positions, encoding="utf-8")
+        with f:
+            tasks = [(line, args.engine) for line in f if line.strip()]
+        for result in run(analyze, tasks, args.workers):
+            print(json.dumps(result))
+        seconds = time.perf_counter() - start
+        print(f"{len(tasks)} positions in {seconds:.3f}s: "
+              f"{len(tasks) / seconds:,.0f} positions/sec", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
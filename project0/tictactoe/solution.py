@@ -0,0 +1,117 @@
+"""
+Precomputed solution table for Tic Tac Toe.
+
+Every position reachable from the empty board is solved once by
+retrograde analysis: positions are grouped by the number of marks on
+the board and solved from full boards back to the empty one, so each
+position's value comes straight from its already solved successors.
+
+The table holds one byte per base-3 board index (tictactoe.encode) with
+the position's value and best move, and is written to
+tictactoe.SOLUTION_FILE, which tictactoe.py loads at startup to answer
+minimax() with a single lookup.
+
+Usage: python solution.py [output]
+"""
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def reachable():
+    """
+    Returns the positions reachable from the empty board as a list
+    of {index: board} dicts, one per number of marks.
+    """
+    board = ttt.initial_state()
+    layers = [{ttt.encode(board): board}]
+    while True:
+        layer = {}
+        for board in layers[-1].values():
+            if ttt.terminal(board):
+                continue
+            for action in ttt.ordered_actions(board):
+                child = ttt.result(board, action)
+                layer.setdefault(ttt.encode(child), child)
+        if not layer:
+            return layers
+        layers.append(layer)
+
+
+def solve():
+    """
+    Returns the solution table as a bytearray of 3 ** 9 entries.
+    """
+    entries = bytearray([ttt.UNSOLVED]) * 3 ** 9
+    values = {}
+    for layer in reversed(reachable()):
+        for index, board in layer.items():
+            if ttt.terminal(board):
+                value = ttt.utility(board)
+                move = ttt.NO_MOVE
+            else:
+                # X maximizes and O minimizes; ties go to the first
+                # move in MOVE_ORDER, as in the search engines
+                sign = 1 if ttt.player(board) == ttt.X else -1
+                value = None
+                for i, j in ttt.ordered_actions(board):
+                    child = values[ttt.encode(ttt.result(board, (i, j)))]
+                    if value is None or sign * child > sign * value:
+                        value = child
+                        move = 3 * i + j
+            values[index] = value
+            entries[index] = (value + 1) << 4 | move
+    return entries
+
+
+def save(entries, path=ttt.SOLUTION_FILE):
+    with open(path, "wb") as f:
+        f.write(ttt.SOLUTION_MAGIC)
+        f.write(entries)
+
+
+def latency(engine, boards, reset):
+    """
+    Returns the mean seconds per minimax() call over `boards`.
+    """
+    start = time.perf_counter()
+    for board in boards:
+        reset()
+        ttt.minimax(board, engine)
+    return (time.perf_counter() - start) / len(boards)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python solution.py [output]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.SOLUTION_FILE
+
+    start = time.perf_counter()
+    entries = solve()
+    save(entries, path)
+    solved = len(entries) - entries.count(ttt.UNSOLVED)
+    print(f"Solved {solved} positions in {time.perf_counter() - start:.3f}s, "
+          f"table size {len(ttt.SOLUTION_MAGIC) + len(entries)} bytes")
+
+    start = time.perf_counter()
+    ttt.solution = ttt.load_solution(path)
+    print(f"Loaded in {(time.perf_counter() - start) * 1000:.3f} ms")
+
+    # Query latency over every non-terminal position, each search
+    # starting from an empty transposition table
+    boards = [board for layer in reachable() for board in layer.values()
+              if not ttt.terminal(board)]
+    timings = {
+        "table": latency("table", boards, lambda: None),
+        "memo": latency("memo", boards, ttt.table.clear),
+        "alphabeta": latency("alphabeta", boards, lambda: None),
+    }
+    print(f"Mean query latency over {len(boards)} positions")
+    for engine, seconds in timings.items():
+        print(f"    {engine:<12}{seconds * 1e6:>12.1f} us"
+              f"{timings[engine] / timings['table']:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
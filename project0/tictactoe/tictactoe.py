@@ -1,13 +1,53 @@
 """
 Tic Tac Toe Player
 """
+from collections import OrderedDict
 from copy import deepcopy
 import math
+import os
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Order in which alpha-beta tries moves: center, then corners, then edges
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Search instrumentation, see reset_stats()
+stats = {"nodes": 0, "hits": 0, "misses": 0}
+
+# The 8 symmetries of the board (rotations and reflections), each as
+# the cell index (3 * i + j) that every cell of the transformed board
+# is taken from
+SYMMETRIES = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8],
+    [6, 3, 0, 7, 4, 1, 8, 5, 2],
+    [8, 7, 6, 5, 4, 3, 2, 1, 0],
+    [2, 5, 8, 1, 4, 7, 0, 3, 6],
+    [2, 1, 0, 5, 4, 3, 8, 7, 6],
+    [6, 7, 8, 3, 4, 5, 0, 1, 2],
+    [0, 3, 6, 1, 4, 7, 2, 5, 8],
+    [8, 5, 2, 7, 4, 1, 6, 3, 0],
+]
+
+# Transposition table of canonical board -> minimax value, shared by
+# every call to minimax() and bounded to TABLE_SIZE entries (least
+# recently used entries are dropped first)
+TABLE_SIZE = 100000
+table = OrderedDict()
+
+# Precomputed solution of every reachable position, built by
+# solution.py: SOLUTION_MAGIC followed by one byte per encode() index,
+# holding (value + 1) << 4 | 3 * i + j of the best move (NO_MOVE on
+# terminal boards), or UNSOLVED for unreachable positions
+SOLUTION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solution.bin")
+SOLUTION_MAGIC = b"TTTSOL1\0"
+NO_MOVE = 0x0F
+UNSOLVED = 0xFF
+solution = None
+
 
 def initial_state():
     """
@@ -123,8 +163,223 @@ def utility(board):
 
     return 0
     
+def reset_stats():
+    """
+    Resets the search counters in `stats`.
+    """
+    stats["nodes"] = 0
+    stats["hits"] = 0
+    stats["misses"] = 0
+
+
+def table_info():
+    """
+    Returns the transposition table's size and hit rate.
+    """
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "size": len(table),
+        "capacity": TABLE_SIZE,
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": stats["hits"] / lookups if lookups else 0.0
+    }
+
+
+def canonical(board):
+    """
+    Returns an integer key for the board that is the same for all
+    of its rotations and reflections: the smallest base-3 encoding
+    of the cells over the 8 symmetries.
+    """
+    digits = {EMPTY: 0, X: 1, O: 2}
+    cells = [digits[cell] for row in board for cell in row]
+    key = None
+    for symmetry in SYMMETRIES:
+        code = 0
+        for index in symmetry:
+            code = 3 * code + cells[index]
+        if key is None or code < key:
+            key = code
+    return key
+
+
+def encode(board):
+    """
+    Returns the board's base-3 index (EMPTY = 0, X = 1, O = 2, cell
+    (0, 0) most significant), between 0 and 3 ** 9 - 1.
+    """
+    digits = {EMPTY: 0, X: 1, O: 2}
+    code = 0
+    for row in board:
+        for cell in row:
+            code = 3 * code + digits[cell]
+    return code
+
+
+def load_solution(path=SOLUTION_FILE):
+    """
+    Reads a solution table written by solution.py.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    header = len(SOLUTION_MAGIC)
+    if data[:header] != SOLUTION_MAGIC or len(data) != header + 3 ** 9:
+        raise ValueError(f"{path} is not a Tic Tac Toe solution table")
+    return data[header:]
+
+
+def solution_move(board):
+    """
+    Returns the optimal action for the current player on the board by
+    looking it up in the solution table, falling back to memo_move()
+    if no table is loaded or the position is not in it.
+    """
+    if solution is not None:
+        entry = solution[encode(board)]
+        if entry != UNSOLVED:
+            move = entry & 0x0F
+            return None if move == NO_MOVE else divmod(move, 3)
+    return memo_move(board)
+
+
+def memo_value(board):
+    """
+    Returns the minimax value of the board, looking it up in (and
+    storing it to) the transposition table.
+    """
+    key = canonical(board)
+    if key in table:
+        stats["hits"] += 1
+        table.move_to_end(key)
+        return table[key]
+    stats["misses"] += 1
+    stats["nodes"] += 1
+
+    if terminal(board):
+        value = utility(board)
+    elif player(board) == X:
+        value = -1
+        for action in ordered_actions(board):
+            value = max(value, memo_value(result(board, action)))
+            if value == 1:
+                break
+    else:
+        value = 1
+        for action in ordered_actions(board):
+            value = min(value, memo_value(result(board, action)))
+            if value == -1:
+                break
+
+    table[key] = value
+    if len(table) > TABLE_SIZE:
+        table.popitem(last=False)
+    return value
+
+
+def memo_move(board):
+    """
+    Returns the optimal action for the current player on the board,
+    using the transposition table.
+    """
+    if terminal(board):
+        return None
+
+    best_action = None
+    if player(board) == X:
+        best_value = -math.inf
+        for action in ordered_actions(board):
+            value = memo_value(result(board, action))
+            if value > best_value:
+                best_value = value
+                best_action = action
+            if value == 1:
+                break
+    else:
+        best_value = math.inf
+        for action in ordered_actions(board):
+            value = memo_value(result(board, action))
+            if value < best_value:
+                best_value = value
+                best_action = action
+            if value == -1:
+                break
+    return best_action
+
+
+def ordered_actions(board):
+    """
+    Returns the available actions in MOVE_ORDER.
+    """
+    return [(i, j) for (i, j) in MOVE_ORDER if board[i][j] == EMPTY]
+
+
+def alpha_beta(board, alpha, beta):
+    """
+    Returns the minimax value of the board, searching moves in
+    MOVE_ORDER and pruning branches that cannot change the result.
+    """
+    stats["nodes"] += 1
+
+    if terminal(board):
+        return utility(board)
+
+    if player(board) == X:
+        value = -math.inf
+        for action in ordered_actions(board):
+            value = max(value, alpha_beta(result(board, action), alpha, beta))
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return value
+    else:
+        value = math.inf
+        for action in ordered_actions(board):
+            value = min(value, alpha_beta(result(board, action), alpha, beta))
+            beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return value
+
+
+def alpha_beta_move(board):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta search.
+    """
+    if terminal(board):
+        return None
+
+    # Utilities lie in [-1, 1], so searching with that window stops as
+    # soon as a move is known to win
+    alpha = -1
+    beta = 1
+    best_action = None
+
+    if player(board) == X:
+        for action in ordered_actions(board):
+            value = alpha_beta(result(board, action), alpha, beta)
+            if best_action is None or value > alpha:
+                alpha = value
+                best_action = action
+            if alpha >= beta:
+                break
+    else:
+        for action in ordered_actions(board):
+            value = alpha_beta(result(board, action), alpha, beta)
+            if best_action is None or value < beta:
+                beta = value
+                best_action = action
+            if alpha >= beta:
+                break
+
+    return best_action
+
+
 def min_max(board,min_move):
 
+    stats["nodes"] += 1
+
     if terminal(board):
         return utility(board)
 
@@ -148,10 +403,18 @@ def min_max(board,min_move):
         return max_val
 
 
-def minimax(board):
+def minimax(board, engine="table"):
     """
     Returns the optimal action for the current player on the board.
+
+    `engine` selects the search: "table" (the default) to look the
+    move up in the precomputed solution table, "memo" for alpha-beta
+    style search over the transposition table shared across calls,
+    "alphabeta" for plain alpha-beta, or "minimax" for the exhaustive
+    search.
     """
+    if engine != "minimax":
+        return ENGINES[engine](board)
 
     if terminal(board) :
         return None
@@ -188,3 +451,15 @@ def minimax(board):
                 best_action = action
 
         return best_action
+
+
+# Search engines selectable in minimax()
+ENGINES = {
+    "alphabeta": alpha_beta_move,
+    "memo": memo_move,
+    "table": solution_move,
+}
+
+# Load the solution table at startup if it has been built
+if os.path.exists(SOLUTION_FILE):
+    solution = load_solution()
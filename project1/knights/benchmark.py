@@ -0,0 +1,246 @@
+"""
+Benchmark for the logic.py model checking engines.
+
+Runs model_check with every engine on the puzzle.py knowledge bases,
+querying each puzzle symbol, checks that all engines agree and reports
+the time per query. Larger knowledge bases come from a chain of n
+people where each one says the next is a knave (2n symbols).
+
+It also times building a random knowledge base of 3-literal clauses,
+and reports the memory it takes, and compares worker counts of the
+parallel engine and count_models().
+
+Usage: python benchmark.py [--repeat N] [--people N [N ...]] [--clauses N]
+                           [--workers N [N ...]]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import logic
+from logic import (And, Biconditional, ENGINES, KnowledgeBase, Not, Or, Symbol,
+                   count_models, model_check, parallel_check)
+import puzzle
+
+# Engines that go through every model are skipped beyond this many
+# symbols
+SLOW_ENGINES = {"bitset": 26, "compiled": 16, "enumerate": 14}
+
+# The parallel engine starts a pool of processes per query, so it is
+# only timed on its own, by scaling()
+TABLE_ENGINES = [engine for engine in ENGINES if engine != "parallel"]
+
+
+def chain(people):
+    """
+    Returns the knowledge base of a chain of `people` people, each
+    saying that the next one is a knave, and the first knight symbol.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(people)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(people)]
+    conjuncts = []
+    for i in range(people):
+        conjuncts.append(Or(knights[i], knaves[i]))
+        conjuncts.append(Not(And(knights[i], knaves[i])))
+        if i + 1 < people:
+            conjuncts.append(Biconditional(knights[i], knaves[i + 1]))
+    return And(*conjuncts), knights[0]
+
+
+def random_knowledge(clauses, symbols, seed=0):
+    """
+    Returns a knowledge base of `clauses` random clauses of three
+    literals over `symbols` symbols.
+    """
+    rng = random.Random(seed)
+    names = [f"P{i}" for i in range(symbols)]
+    conjuncts = []
+    for _ in range(clauses):
+        literals = []
+        for name in rng.sample(names, 3):
+            literal = Symbol(name)
+            literals.append(literal if rng.random() < 0.5 else Not(literal))
+        conjuncts.append(Or(*literals))
+    return And(*conjuncts)
+
+
+def construction(clauses, symbols):
+    """
+    Reports the time and memory taken to build a random knowledge base
+    and to hash it and list its symbols.
+    """
+    start = time.perf_counter()
+    knowledge = random_knowledge(clauses, symbols)
+    built = time.perf_counter() - start
+
+    # Build it again from scratch to measure its memory, as tracing
+    # allocations slows construction down
+    del knowledge
+    tracemalloc.start()
+    knowledge = random_knowledge(clauses, symbols)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        hash(knowledge)
+        knowledge.symbols()
+    lookups = (time.perf_counter() - start) / 100
+
+    print(f"{clauses} clauses over {symbols} symbols: built in {built * 1000:.1f} ms, "
+          f"{memory / 2 ** 20:.2f} MiB, {len(logic.interned)} distinct sentences")
+    print(f"    hash and symbols in {lookups * 1e6:.1f} us")
+
+
+def time_queries(engine, knowledge, queries, repeat):
+    """
+    Returns the mean seconds per query, the answers of `engine` and
+    its logic.stats summed over the queries.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        answers = []
+        totals = dict.fromkeys(logic.stats, 0)
+        for query in queries:
+            answers.append(model_check(knowledge, query, engine))
+            for key, value in logic.stats.items():
+                totals[key] += value
+    return (time.perf_counter() - start) / (repeat * len(queries)), answers, totals
+
+
+def sweep(knowledge, repeat):
+    """
+    Asks whether each symbol of the knowledge base, and its negation,
+    is entailed, with model_check() from scratch and with one
+    KnowledgeBase. Returns the seconds per sweep and the SAT solver's
+    work per sweep of each method.
+    """
+    symbols = [Symbol(name) for name in sorted(knowledge.symbols())]
+    queries = symbols + [Not(symbol) for symbol in symbols]
+
+    results = {}
+    for method in ["auto", "sat", "incremental"]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            totals = dict.fromkeys(logic.stats, 0)
+            answers = []
+            if method == "incremental":
+                base = KnowledgeBase(knowledge)
+            for query in queries:
+                if method == "incremental":
+                    answers.append(base.ask(query))
+                else:
+                    answers.append(model_check(knowledge, query, method))
+                for key, value in logic.stats.items():
+                    totals[key] += value
+        results[method] = ((time.perf_counter() - start) / repeat, answers, totals)
+
+    first = results["auto"][1]
+    for method, (_, answers, _) in results.items():
+        if answers != first:
+            raise RuntimeError(f"{method} sweep disagrees: {answers} != {first}")
+    return len(queries), results
+
+
+def scaling(people, counts):
+    """
+    Reports the time of a full parallel check (of an entailed query)
+    and of count_models on a chain puzzle, with each worker count in
+    `counts`.
+    """
+    knowledge, knight = chain(people)
+    query = Or(knight, Symbol("0 is a Knave"))
+    print(f"{'workers':<10}{'check':>12}{'count':>12}   (ms, chain {people}, "
+          f"{2 * people} symbols)")
+    for workers in counts:
+        start = time.perf_counter()
+        entailed = parallel_check(knowledge, query, workers)
+        middle = time.perf_counter()
+        models = count_models(knowledge, workers)
+        end = time.perf_counter()
+        if not entailed or models != 2:
+            raise RuntimeError(f"wrong parallel result with {workers} workers")
+        print(f"{workers:<10}{(middle - start) * 1000:>12.1f}{(end - middle) * 1000:>12.1f}"
+              f"   {logic.stats['chunks']} partitions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model checking engines.")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--people", type=int, nargs="*", default=[4, 8, 12, 50, 500],
+                        help="sizes of the generated chain puzzles")
+    parser.add_argument("--clauses", type=int, default=10000,
+                        help="size of the random knowledge base built")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4],
+                        help="worker counts of the parallel engine to compare")
+    args = parser.parse_args()
+
+    construction(args.clauses, 1000)
+
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    cases = [
+        ("Puzzle 0", puzzle.knowledge0, symbols, args.repeat),
+        ("Puzzle 1", puzzle.knowledge1, symbols, args.repeat),
+        ("Puzzle 2", puzzle.knowledge2, symbols, args.repeat),
+        ("Puzzle 3", puzzle.knowledge3, symbols, args.repeat),
+    ]
+    for people in args.people:
+        knowledge, query = chain(people)
+        cases.append((f"Chain {people}", knowledge, [query], 1))
+
+    print(f"{'':<10}{'symbols':>8}" + "".join(f"{engine:>12}" for engine in TABLE_ENGINES)
+          + "   (ms/query)")
+    for name, knowledge, queries, repeat in cases:
+        count = len(knowledge.symbols().union(*[q.symbols() for q in queries]))
+        line = f"{name:<10}{count:>8}"
+        answers = {}
+        totals = {}
+        for engine in TABLE_ENGINES:
+            if count > SLOW_ENGINES.get(engine, count):
+                line += f"{'-':>12}"
+                continue
+            seconds, answers[engine], totals[engine] = time_queries(
+                engine, knowledge, queries, repeat)
+            line += f"{seconds * 1000:>12.3f}"
+
+        first = next(iter(answers.values()))
+        for engine, result in answers.items():
+            if result != first:
+                raise RuntimeError(f"{engine} disagrees on {name}: {result} != {first}")
+        print(line)
+
+        # Per query work of the bitset and SAT engines
+        notes = []
+        if "bitset" in totals and totals["bitset"]["chunks"] > len(queries):
+            notes.append(f"bitset used {totals['bitset']['chunks'] / len(queries):.1f} chunks")
+        sat = {key: value / len(queries) for key, value in totals["sat"].items()}
+        notes.append(f"sat made {sat['decisions']:.1f} decisions, "
+                     f"{sat['propagations']:.1f} propagations, "
+                     f"{sat['conflicts']:.1f} conflicts")
+        print(f"{'':<18}" + "; ".join(notes) + " per query")
+
+    # Ask about every symbol of the same knowledge base
+    print()
+    print(f"{'sweep':<10}{'queries':>8}{'auto':>12}{'sat':>12}{'incremental':>12}"
+          f"   (ms/sweep)")
+    for name, knowledge, _, repeat in cases:
+        if len(knowledge.symbols()) > 100:
+            continue
+        count, results = sweep(knowledge, max(1, repeat // 10))
+        print(f"{name:<10}{count:>8}" + "".join(
+            f"{seconds * 1000:>12.3f}" for seconds, _, _ in results.values()))
+        for method in ["sat", "incremental"]:
+            totals = results[method][2]
+            print(f"{'':<18}{method}: {totals['decisions']} decisions, "
+                  f"{totals['propagations']} propagations, "
+                  f"{totals['conflicts']} conflicts per sweep")
+
+    if args.workers:
+        print()
+        scaling(12, args.workers)
+
+
+if __name__ == "__main__":
+    main()
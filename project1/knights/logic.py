@@ -1,7 +1,69 @@
+import contextlib
+import functools
 import itertools
+import multiprocessing
+import os
+import weakref
+
+import sat
+
+# Largest number of symbols whose models bitset_check() evaluates at
+# once, as ints of 2 ** CHUNK_BITS bits (128 KiB)
+CHUNK_BITS = 20
+
+# model_check() with the "auto" engine uses the bitset engine up to
+# this many symbols, and the SAT solver beyond
+AUTO_BITSET_SYMBOLS = 16
+
+# Instrumentation of the last check: models and chunks evaluated by
+# bitset_check(), decisions, propagations and conflicts of sat_check()
+# (loading the clauses included) or of one KnowledgeBase.ask()
+stats = {"models": 0, "chunks": 0,
+         "decisions": 0, "propagations": 0, "conflicts": 0, "learned": 0}
+
+# Weak references to every sentence in existence by class and children
+# (or name), so that equal sentences are one shared object
+interned = {}
+
+
+def forget(ref):
+    """
+    Drops the entry of a sentence that no longer exists from `interned`.
+    """
+    if interned.get(ref.key) is ref:
+        del interned[ref.key]
 
 
 class Sentence():
+    """
+    Immutable logical sentence. Equal sentences are the same object,
+    whose hash and set of symbols are computed once, when it is built.
+    """
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    @classmethod
+    def node(cls, key, hash_value, symbols, **fields):
+        """
+        Returns the sentence of class `cls` identified by `key`, built
+        with `fields` unless an equal sentence already exists.
+        """
+        key = (cls, key)
+        ref = interned.get(key)
+        sentence = None if ref is None else ref()
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "_hash", hash_value)
+            object.__setattr__(sentence, "_symbols", symbols)
+            interned[key] = weakref.KeyedRef(sentence, forget, key)
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -11,9 +73,33 @@ class Sentence():
         """Returns string formula representing logical sentence."""
         return ""
 
+    def expression(self, index):
+        """
+        Returns a Python expression evaluating the sentence over a list
+        `m` of truth values, where `index` maps each symbol name to its
+        position in `m`.
+        """
+        raise Exception("nothing to evaluate")
+
+    def truth_table(self, columns, ones):
+        """
+        Returns the sentence's truth values over a set of models as an
+        int with one bit per model, where `columns` maps each symbol
+        name to its own truth values and `ones` has a bit set for every
+        model.
+        """
+        raise Exception("nothing to evaluate")
+
+    def encode(self, encoding):
+        """
+        Adds clauses to a sat.Encoding constraining a new literal to
+        equal the sentence (the Tseitin encoding), and returns it.
+        """
+        raise Exception("nothing to encode")
+
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +129,13 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        return cls.node(name, hash(("symbol", name)), frozenset([name]), name=name)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,20 +149,32 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def expression(self, index):
+        try:
+            return f"m[{index[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def truth_table(self, columns, ones):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def encode(self, encoding):
+        return encoding.symbol(self.name)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    __slots__ = ("operand",)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.node(operand, hash(("not", hash(operand))), operand.symbols(),
+                        operand=operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,24 +185,32 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def expression(self, index):
+        return f"(not {self.operand.expression(index)})"
+
+    def truth_table(self, columns, ones):
+        return ones ^ self.operand.truth_table(columns, ones)
+
+    def encode(self, encoding):
+        return -encoding.literal(self.operand)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+        return cls.node(
+            conjuncts,
+            hash(("and", tuple(hash(conjunct) for conjunct in conjuncts))),
+            frozenset().union(*[conjunct.symbols() for conjunct in conjuncts]),
+            conjuncts=conjuncts
         )
 
+    def __reduce__(self):
+        return (And, self.conjuncts)
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -114,8 +218,9 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise AttributeError(
+            "sentences are immutable, build And(*conjuncts, conjunct) instead"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,24 +231,44 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(index) for conjunct in self.conjuncts
+        ) + ")"
+
+    def truth_table(self, columns, ones):
+        table = ones
+        for conjunct in self.conjuncts:
+            table &= conjunct.truth_table(columns, ones)
+        return table
+
+    def encode(self, encoding):
+        literals = [encoding.literal(conjunct) for conjunct in self.conjuncts]
+        v = encoding.new_variable()
+        for literal in literals:
+            encoding.add([-v, literal])
+        encoding.add([v] + [-literal for literal in literals])
+        return v
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+        return cls.node(
+            disjuncts,
+            hash(("or", tuple(hash(disjunct) for disjunct in disjuncts))),
+            frozenset().union(*[disjunct.symbols() for disjunct in disjuncts]),
+            disjuncts=disjuncts
         )
 
+    def __reduce__(self):
+        return (Or, self.disjuncts)
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -157,24 +282,43 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(index) for disjunct in self.disjuncts
+        ) + ")"
+
+    def truth_table(self, columns, ones):
+        table = 0
+        for disjunct in self.disjuncts:
+            table |= disjunct.truth_table(columns, ones)
+        return table
+
+    def encode(self, encoding):
+        literals = [encoding.literal(disjunct) for disjunct in self.disjuncts]
+        v = encoding.new_variable()
+        for literal in literals:
+            encoding.add([v, -literal])
+        encoding.add([-v] + literals)
+        return v
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return cls.node(
+            (antecedent, consequent),
+            hash(("implies", hash(antecedent), hash(consequent))),
+            antecedent.symbols() | consequent.symbols(),
+            antecedent=antecedent, consequent=consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +332,41 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, index):
+        antecedent = self.antecedent.expression(index)
+        consequent = self.consequent.expression(index)
+        return f"(not {antecedent} or {consequent})"
+
+    def truth_table(self, columns, ones):
+        antecedent = self.antecedent.truth_table(columns, ones)
+        consequent = self.consequent.truth_table(columns, ones)
+        return (ones ^ antecedent) | consequent
+
+    def encode(self, encoding):
+        antecedent = encoding.literal(self.antecedent)
+        consequent = encoding.literal(self.consequent)
+        v = encoding.new_variable()
+        encoding.add([-v, -antecedent, consequent])
+        encoding.add([v, antecedent])
+        encoding.add([v, -consequent])
+        return v
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return cls.node(
+            (left, right),
+            hash(("biconditional", hash(left), hash(right))),
+            left.symbols() | right.symbols(),
+            left=left, right=right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,11 +382,300 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
+    def expression(self, index):
+        # Unlike evaluate(), each side is evaluated once
+        left = self.left.expression(index)
+        right = self.right.expression(index)
+        return f"({left} == {right})"
+
+    def truth_table(self, columns, ones):
+        left = self.left.truth_table(columns, ones)
+        right = self.right.truth_table(columns, ones)
+        return ones ^ (left ^ right)
+
+    def encode(self, encoding):
+        left = encoding.literal(self.left)
+        right = encoding.literal(self.right)
+        v = encoding.new_variable()
+        encoding.add([-v, -left, right])
+        encoding.add([-v, left, -right])
+        encoding.add([v, left, right])
+        encoding.add([v, -left, -right])
+        return v
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function evaluating the sentence on a sequence of truth
+    values, one for each symbol name in `symbols`, in order.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    return compile_expression(sentence.expression(index))
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(expression):
+    """
+    Returns the function `lambda m: expression`, compiled once for each
+    distinct expression, since compiling costs far more than a check.
+    """
+    return eval(f"lambda m: {expression}")
+
+
+def model_check(knowledge, query, engine="auto"):
+    """
+    Checks if knowledge base entails query.
+
+    `engine` selects how models are checked: "compiled" compiles the
+    sentences to one Python function of a tuple of truth values and
+    runs it on every model, "bitset" evaluates each connective on the
+    truth tables of all models at once, "parallel" splits those models
+    across processes, "enumerate" evaluates the Sentence objects on
+    each model dict, and "sat" searches for a model of the knowledge
+    base where the query is false with a SAT solver. "auto" (the
+    default) picks "bitset" for small knowledge bases and "sat" for
+    the others.
+    """
+    reset_stats()
+    if engine == "auto":
+        symbols = knowledge.symbols() | query.symbols()
+        engine = "bitset" if len(symbols) <= AUTO_BITSET_SYMBOLS else "sat"
+    return ENGINES[engine](knowledge, query)
+
+
+def reset_stats():
+    """
+    Zeroes every count in `stats`.
+    """
+    for key in stats:
+        stats[key] = 0
+
+
+def compiled_check(knowledge, query):
+    """Checks if knowledge base entails query, with compiled sentences."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    holds = compile_sentence(knowledge, symbols)
+    entailed = compile_sentence(query, symbols)
+
+    # The query must hold in every model where the knowledge base holds
+    models = itertools.product((True, False), repeat=len(symbols))
+    return all(entailed(model) for model in models if holds(model))
+
+
+@functools.lru_cache(maxsize=4)
+def symbol_columns(symbols):
+    """
+    Returns the truth tables of a tuple of symbols over the
+    2 ** len(symbols) models in which they take every combination of
+    values (in model j, symbol i is true if bit i of j is set), and the
+    table with every model set.
+    """
+    size = 1 << len(symbols)
+    ones = (1 << size) - 1
+    columns = {}
+    for i, symbol in enumerate(symbols):
+        # Runs of 2 ** i false then 2 ** i true models, doubled up to
+        # the size of the table
+        column = ((1 << (1 << i)) - 1) << (1 << i)
+        length = 2 << i
+        while length < size:
+            column |= column << length
+            length *= 2
+        columns[symbol] = column
+    return columns, ones
+
+
+def partition_columns(symbols, prefix_bits, prefix):
+    """
+    Returns the truth tables of `symbols` over the partition of models
+    in which the first `prefix_bits` symbols are fixed to the bits of
+    `prefix` (symbol i true if bit i is set), and the table with every
+    model of the partition set.
+    """
+    columns, ones = symbol_columns(tuple(symbols[prefix_bits:]))
+    columns = dict(columns)
+    for i, symbol in enumerate(symbols[:prefix_bits]):
+        columns[symbol] = ones if prefix >> i & 1 else 0
+    return columns, ones
+
+
+def partition_bits(count, workers=1):
+    """
+    Returns how many of `count` symbols to fix in each partition: enough
+    for partitions of at most 2 ** CHUNK_BITS models, and for at least
+    4 partitions per worker when there are several.
+    """
+    bits = max(0, count - CHUNK_BITS)
+    if workers > 1:
+        bits = max(bits, (4 * workers - 1).bit_length())
+    return min(bits, count)
+
+
+def has_counterexample(task):
+    """
+    Returns True if some model of a partition, given as (knowledge,
+    query, symbols, prefix_bits, prefix), satisfies the knowledge base
+    but not the query.
+    """
+    knowledge, query, symbols, prefix_bits, prefix = task
+    columns, ones = partition_columns(symbols, prefix_bits, prefix)
+    return bool(knowledge.truth_table(columns, ones)
+                & ~query.truth_table(columns, ones))
+
+
+def count_partition(task):
+    """
+    Returns the number of models of a partition, given as (sentence,
+    symbols, prefix_bits, prefix), that satisfy the sentence.
+    """
+    sentence, symbols, prefix_bits, prefix = task
+    columns, ones = partition_columns(symbols, prefix_bits, prefix)
+    return sentence.truth_table(columns, ones).bit_count()
+
+
+def partitioned(function, tasks, workers):
+    """
+    Yields function(task) for each task, computed in a pool of
+    `workers` processes in the order they finish (in this process, in
+    order, if `workers` is 1). Closing the generator terminates the pool.
+    """
+    if workers <= 1:
+        yield from map(function, tasks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(function, tasks)
+
+
+def bitset_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, on truth tables holding one
+    bit per model.
+
+    Up to 2 ** CHUNK_BITS models are evaluated at once; with more
+    symbols, the models are split into partitions in which the first
+    symbols are fixed, and stats["chunks"] records how many partitions
+    were evaluated.
+    """
+    return parallel_check(knowledge, query, workers=1)
+
+
+def parallel_check(knowledge, query, workers=None):
+    """
+    Checks if knowledge base entails query like bitset_check(), with
+    the partitions of the models checked by `workers` processes (by
+    default one per CPU). The check stops as soon as a partition holds
+    a model of the knowledge base where the query is false.
+    """
+    workers = workers or os.cpu_count()
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    prefix_bits = partition_bits(len(symbols), workers)
+    tasks = [(knowledge, query, symbols, prefix_bits, prefix)
+             for prefix in range(1 << prefix_bits)]
+    stats["models"] = 1 << len(symbols)
+    stats["chunks"] = 0
+
+    results = partitioned(has_counterexample, tasks, workers)
+    with contextlib.closing(results):
+        for found in results:
+            stats["chunks"] += 1
+            if found:
+                return False
+    return True
+
+
+def count_models(sentence, workers=1):
+    """
+    Returns the number of assignments to the sentence's symbols that
+    satisfy it, counting the partitions of the models in `workers`
+    processes.
+    """
+    symbols = sorted(sentence.symbols())
+    prefix_bits = partition_bits(len(symbols), workers)
+    tasks = [(sentence, symbols, prefix_bits, prefix)
+             for prefix in range(1 << prefix_bits)]
+    stats["models"] = 1 << len(symbols)
+    stats["chunks"] = len(tasks)
+    return sum(partitioned(count_partition, tasks, workers))
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, that is if knowledge
+    base and not query is unsatisfiable, with a CDCL SAT solver.
+    """
+    base = KnowledgeBase(knowledge)
+    entailed = base.ask(query)
+    stats.update(base.solver.stats)
+    return entailed
+
+
+class KnowledgeBase():
+    """
+    Sentences known to be true, kept as clauses in a SAT solver so that
+    many queries can be asked without starting over.
+
+    Each query is solved assuming it is false, rather than by adding
+    its negation, so clauses learned while answering one query remain
+    valid for the next ones.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.encoding = sat.Encoding()
+        self.solver = sat.Solver()
+        self.added = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """
+        Adds a sentence to the knowledge base.
+        """
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+
+        # Conjuncts are asserted one by one
+        conjuncts = sentence.conjuncts if isinstance(sentence, And) else [sentence]
+        for conjunct in conjuncts:
+            self.encoding.add([self.encoding.literal(conjunct)])
+        self.flush()
+
+    def flush(self):
+        """
+        Passes the clauses encoded since the last call to the solver.
+        """
+        for clause in self.encoding.clauses[self.added:]:
+            self.solver.add_clause(clause)
+        self.added = len(self.encoding.clauses)
+
+    def ask(self, query):
+        """
+        Returns True if the knowledge base entails the query.
+        """
+        Sentence.validate(query)
+
+        # Defining the query's literal adds clauses that only constrain
+        # new variables, which leaves the knowledge base unchanged
+        literal = self.encoding.literal(query)
+        self.flush()
+
+        reset_stats()
+        before = dict(self.solver.stats)
+        entailed = not self.solver.solve([-literal])
+        for key, value in self.solver.stats.items():
+            stats[key] = value - before[key]
+        return entailed
+
+    @property
+    def knowledge(self):
+        """
+        Returns the conjunction of the sentences in the knowledge base.
+        """
+        return And(*self.sentences)
+
+
+def enumerate_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
     def check_all(knowledge, query, symbols, model):
@@ -257,7 +707,17 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+# Model checking engines selectable in model_check()
+ENGINES = {
+    "bitset": bitset_check,
+    "compiled": compiled_check,
+    "enumerate": enumerate_check,
+    "parallel": parallel_check,
+    "sat": sat_check,
+}
@@ -0,0 +1,325 @@
+"""
+CNF encoding and a CDCL SAT solver for logic.py.
+
+Sentences are turned into clauses by the Tseitin encoding: every
+connective gets a fresh variable constrained to equal it, so the CNF
+grows linearly with the sentence instead of exponentially.
+
+Clauses are lists of non-zero ints, v for variable v and -v for its
+negation. The solver is a conflict-driven DPLL: unit propagation with
+two watched literals per clause, first-UIP clause learning with
+non-chronological backjumping, and decisions on the most active
+variable, tried with its last value.
+"""
+
+
+class Encoding():
+    """
+    CNF clauses and variables for a set of sentences.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}
+        self.count = 0
+        self.literals = {}
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def symbol(self, name):
+        """
+        Returns the variable of a symbol name.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns a literal equal to the sentence, encoding it (once for
+        equal sentences) with its encode() method.
+        """
+        if sentence not in self.literals:
+            self.literals[sentence] = sentence.encode(self)
+        return self.literals[sentence]
+
+    def add(self, clause):
+        self.clauses.append(clause)
+
+
+class Solver():
+
+    def __init__(self, clauses=(), count=0):
+        """
+        Creates a solver for `clauses` over variables 1 to `count`.
+        """
+        self.count = 0
+        self.clauses = []
+        self.watches = [[], []]
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.increment = 1.0
+        self.unsatisfiable = False
+        self.model = None
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0, "learned": 0}
+
+        self.reserve(count)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def reserve(self, count):
+        """
+        Makes room for variables up to `count`.
+        """
+        while self.count < count:
+            self.count += 1
+            self.watches.extend(([], []))
+            self.values.append(None)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(False)
+
+    def value(self, literal):
+        """
+        Returns True or False if the literal is assigned, else None.
+        """
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, between searches. Returns False if the clauses
+        have become unsatisfiable.
+        """
+        if self.unsatisfiable:
+            return False
+        self.reserve(max((abs(literal) for literal in clause), default=0))
+
+        # Drop duplicate and false literals, and satisfied clauses
+        literals = []
+        for literal in clause:
+            value = self.value(literal)
+            if value is True or -literal in literals:
+                return True
+            if value is None and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.unsatisfiable = True
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.attach(literals)
+        return not self.unsatisfiable
+
+    def attach(self, clause):
+        """
+        Stores a clause of two or more literals, watching its first two.
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[watch(clause[0])].append(index)
+        self.watches[watch(clause[1])].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns the literals implied by unit clauses until none are left.
+        Returns the index of a clause with all literals false, or None.
+        """
+        while self.head < len(self.trail):
+            literal = self.trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+
+            # Visit the clauses watching the literal that became false
+            false = -literal
+            watching = self.watches[watch(false)]
+            kept = []
+            conflict = None
+            for position, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[watch(clause[1])].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) is False:
+                        conflict = index
+                        kept.extend(watching[position + 1:])
+                        break
+                    self.assign(clause[0], index)
+            self.watches[watch(false)] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from a conflict, with the
+        literal that it asserts first, and the level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail)
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Walk back the trail to the next literal of this level
+            index -= 1
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+        backjump = 0
+        if len(learned) > 1:
+            # Watch the literal of the highest level second
+            highest = max(range(1, len(learned)),
+                          key=lambda i: self.levels[abs(learned[i])])
+            learned[1], learned[highest] = learned[highest], learned[1]
+            backjump = self.levels[abs(learned[1])]
+        self.increment *= 1.05
+        return learned, backjump
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """
+        Undoes the assignments above decision level `level`.
+        """
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = None
+            self.reasons[variable] = None
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the unassigned variable with the highest activity
+        as a literal of its saved phase, or None if all are assigned.
+        """
+        best = None
+        for variable in range(1, self.count + 1):
+            if self.values[variable] is None and (
+                    best is None or self.activity[variable] > self.activity[best]):
+                best = variable
+        if best is None:
+            return None
+        return best if self.phases[best] else -best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal
+        in `assumptions` true, setting `model` to a satisfying
+        {variable: value}, or False otherwise. Learned clauses are kept
+        for later searches.
+        """
+        self.model = None
+        if self.unsatisfiable:
+            return False
+        self.reserve(max((abs(literal) for literal in assumptions), default=0))
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                if not self.limits:
+                    self.unsatisfiable = True
+                    return False
+                learned, backjump = self.analyze(conflict)
+                self.backtrack(backjump)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                    self.stats["learned"] += 1
+                continue
+
+            # Assumptions are the first decisions
+            literal = None
+            while len(self.limits) < len(assumptions):
+                assumption = assumptions[len(self.limits)]
+                value = self.value(assumption)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value is None:
+                    literal = assumption
+                    break
+
+            if literal is None:
+                literal = self.decide()
+                if literal is None:
+                    self.model = {v: self.values[v] for v in range(1, self.count + 1)}
+                    self.backtrack(0)
+                    return True
+                self.limits.append(len(self.trail))
+                self.stats["decisions"] += 1
+            self.assign(literal, None)
+
+
+def watch(literal):
+    """
+    Returns the index of a literal's list of watching clauses.
+    """
+    return 2 * literal if literal > 0 else -2 * literal + 1
@@ -1,6 +1,20 @@
 import itertools
+import math
 import random
-from copy import deepcopy
+import time
+from collections import deque
+
+# Seconds, and cells per group of linked frontier cells, within which
+# make_random_move computes exact mine probabilities before falling
+# back to estimating them from each sentence alone
+SOLVER_BUDGET = 0.5
+SOLVER_MAX_CELLS = 200
+
+
+class Timeout(Exception):
+    """
+    Raised inside the probability solver when its time budget has run out.
+    """
 
 class Minesweeper():
     """
@@ -144,11 +158,12 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8):
 
-        # Set initial height and width
+        # Set initial height, width, and number of mines
         self.height = height
         self.width = width
+        self.mine_count = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -157,23 +172,47 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, by id, with the ids
+        # of the sentences containing each cell and the id of the
+        # sentence on each set of cells
+        self.sentences = {}
+        self.containing = {}
+        self.ids = {}
+        self.next_id = 0
+
+        # Ids of sentences changed since inferences were last drawn from them
+        self.dirty = deque()
+
+        # Mine configurations counted for each group of frontier sentences
+        # on the last random move, to reuse for the groups left unchanged,
+        # keyed by the group's cells in order (which the per-cell counts
+        # follow) and its sentences
+        self.configurations = {}
 
         self.all_moves = set()
 
-        for i in range(8):
-            for j in range(8):
+        for i in range(self.height):
+            for j in range(self.width):
                 self.all_moves.add((i, j))
 
+    @property
+    def knowledge(self):
+        """
+        List of sentences about the game known to be true.
+        """
+        return list(self.sentences.values())
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence_id in self.containing.pop(cell, ()):
+            sentence = self.sentences[sentence_id]
+            del self.ids[frozenset(sentence.cells)]
             sentence.mark_mine(cell)
+            self.changed(sentence_id)
 
     def mark_safe(self, cell):
         """
@@ -181,8 +220,11 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for sentence_id in self.containing.pop(cell, ()):
+            sentence = self.sentences[sentence_id]
+            del self.ids[frozenset(sentence.cells)]
             sentence.mark_safe(cell)
+            self.changed(sentence_id)
 
     def add_knowledge(self, cell, count):
         """
@@ -198,88 +240,94 @@ class MinesweeperAI():
                if it can be concluded based on the AI's knowledge base
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
-        """
-        
 
+        Inferences are only drawn from sentences that changed, and
+        only against the sentences sharing a cell with them, so the
+        work per move does not grow with the size of the knowledge base.
+        """
         self.moves_made.add(cell)
         self.mark_safe(cell)
-        
-        directions = [[1,1],[-1,-1],[0,1],[1,0],[0,-1],[-1,0],[1,-1],[-1,1]]
-        neightbors = set()
+        self.add_sentence(self.neighbors(cell), count)
 
-        for direction in directions:
-
-            x = direction[0] + cell[0]
-            y = direction[1] + cell[1]
-
-            if x<0 or y<0 or x>=8 or y>=8 :
+        while self.dirty:
+            sentence_id = self.dirty.popleft()
+            sentence = self.sentences.get(sentence_id)
+            if sentence is None:
                 continue
 
-            if((x,y) not in self.safes and (x,y) not in self.moves_made):
-                neightbors.add((x,y))
-    
-        sen = Sentence(deepcopy(neightbors),count)
-
-        self.knowledge.append(sen)
-
-        self.update(sen)
-
-        visited = set()
-
-        while(1):
-            
-            change = False
-
-            for sentence in self.knowledge:
-                self.update(sentence)
-                if not sentence.cells:
-                    self.knowledge.remove(sentence)
-                
-            comb = []
-
-            for sentence in self.knowledge:
-                for sentence_1 in self.knowledge:
-                    comb.append((sentence,sen))
-
-            for sentence,sentence_1 in comb:
-                
-                if sentence_1.cells.issubset(sentence.cells) and sentence_1.cells != sentence.cells and not not sentence_1.cells:
-                    
-                    s = sentence.cells - sentence_1.cells - self.moves_made
-
-                    if tuple(tuple(i) for i in s) in visited:
-                        continue
-
-                    if sentence.count>=sentence_1.count:
-
-                        new = Sentence(deepcopy(s) , sentence.count - sentence_1.count)
-                        
-                        #print(sentence_1,"is subset of ",sentence)
-
-                        self.knowledge.append(new)
-
-                        change = True  
-
-                        visited.add(tuple(tuple(i) for i in s))
-
-                        break;
-             
-            if change == False:
-                break
+            # Every cell of the sentence is a mine, or every cell is safe
+            if sentence.known_mines():
+                for known in list(sentence.cells):
+                    self.mark_mine(known)
+                continue
+            if sentence.known_safes():
+                for known in list(sentence.cells):
+                    self.mark_safe(known)
+                continue
 
-    def update(self,sen):
-        
-        sen.cells = sen.cells-self.moves_made
+            # If one sentence's cells are a subset of another's, the
+            # difference holds the difference of their counts
+            others = set()
+            for known in sentence.cells:
+                others.update(self.containing[known])
+            others.discard(sentence_id)
+            for other_id in others:
+                other = self.sentences[other_id]
+                if other.cells < sentence.cells:
+                    self.add_sentence(sentence.cells - other.cells,
+                                      sentence.count - other.count)
+                elif sentence.cells < other.cells:
+                    self.add_sentence(other.cells - sentence.cells,
+                                      other.count - sentence.count)
+
+    def neighbors(self, cell):
+        """
+        Returns the cells within one row and column of a given cell,
+        not including the cell itself.
+        """
+        cells = set()
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) != cell and 0 <= i < self.height and 0 <= j < self.width:
+                    cells.add((i, j))
+        return cells
 
-        mine = sen.known_mines().copy()
-        safe = sen.known_safes().copy()
-        
-        for cell in mine:
-            self.mark_mine(cell)
+    def add_sentence(self, cells, count):
+        """
+        Adds the sentence that `count` of `cells` are mines, less the
+        cells already known, unless a sentence on the same cells is known.
+        """
+        cells = set(cells)
+        count -= len(cells & self.mines)
+        cells -= self.mines
+        cells -= self.safes
+        key = frozenset(cells)
+        if not cells or key in self.ids:
+            return
+
+        sentence_id = self.next_id
+        self.next_id += 1
+        self.sentences[sentence_id] = Sentence(cells, count)
+        self.ids[key] = sentence_id
+        for cell in cells:
+            self.containing.setdefault(cell, set()).add(sentence_id)
+        self.dirty.append(sentence_id)
+
+    def changed(self, sentence_id):
+        """
+        Re-indexes a sentence whose cells have changed, dropping it if it
+        has no cells left or the same cells as another sentence.
+        """
+        sentence = self.sentences[sentence_id]
+        key = frozenset(sentence.cells)
+        if sentence.cells and key not in self.ids:
+            self.ids[key] = sentence_id
+            self.dirty.append(sentence_id)
+            return
 
-        for cell in safe:
-            self.mark_safe(cell)
-        
+        del self.sentences[sentence_id]
+        for cell in sentence.cells:
+            self.containing[cell].discard(sentence_id)
 
     def make_safe_move(self):
         """
@@ -303,11 +351,205 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        The move is chosen among the cells least likely to be mines.
         """
-        moves = list(self.all_moves - self.mines - self.moves_made)
+        probabilities = self.probabilities()
+        if not probabilities:
+            return None
 
-        if not not moves:
+        lowest = min(probabilities.values())
+        moves = sorted(cell for cell, probability in probabilities.items()
+                       if probability <= lowest + 1e-9)
+        return random.choice(moves)
 
-            return random.choice(moves)
-        
-        return None
\ No newline at end of file
+    def probabilities(self, budget=SOLVER_BUDGET):
+        """
+        Returns the probability that each cell not yet chosen and not
+        known to be a mine is a mine, over all the placements of the
+        remaining mines consistent with the knowledge base.
+
+        The frontier is split into groups of cells linked by sentences,
+        whose mine configurations are counted independently and then
+        combined with the number of mines left for the other cells. If
+        a group is larger than SOLVER_MAX_CELLS or the count takes more
+        than `budget` seconds, the probabilities are estimated instead.
+        """
+        unknown = self.all_moves - self.moves_made - self.mines - self.safes
+        probabilities = {cell: 0.0 for cell in self.safes - self.moves_made}
+        if not unknown:
+            return probabilities
+
+        deadline = time.perf_counter() + budget
+        configurations = {}
+        groups = []
+        try:
+            for cells, constraints in self.groups():
+                if len(cells) > SOLVER_MAX_CELLS:
+                    raise Timeout
+                key = (tuple(cells), frozenset(constraints))
+                if key in self.configurations:
+                    configurations[key] = self.configurations[key]
+                elif key not in configurations:
+                    configurations[key] = count_configurations(cells, constraints, deadline)
+                groups.append((cells, configurations[key]))
+        except Timeout:
+            probabilities.update(self.estimate(unknown))
+            return probabilities
+        self.configurations = configurations
+
+        # A placement with k mines in the groups leaves the rest for the
+        # other cells, each way of placing them counting once
+        others = len(unknown) - sum(len(cells) for cells, _ in groups)
+        left = self.mine_count - len(self.mines)
+
+        def weight(k, cells=others):
+            return math.comb(cells, left - k) if 0 <= left - k <= cells else 0
+
+        # Mine counts of all the groups, and of all but each group
+        prefixes = [{0: 1}]
+        for _, ways in groups:
+            prefixes.append(convolve(prefixes[-1], {k: w for k, (w, _) in ways.items()}))
+        suffix = {0: 1}
+        excluding = [None] * len(groups)
+        for index in reversed(range(len(groups))):
+            excluding[index] = convolve(prefixes[index], suffix)
+            suffix = convolve(suffix, {k: w for k, (w, _) in groups[index][1].items()})
+
+        total = sum(ways * weight(k) for k, ways in prefixes[-1].items())
+        if total == 0:
+            # No placement is consistent with the number of mines
+            probabilities.update(self.estimate(unknown))
+            return probabilities
+
+        for (cells, ways), rest in zip(groups, excluding):
+            mines = [0] * len(cells)
+            for k, (_, counts) in ways.items():
+                factor = sum(w * weight(k + j) for j, w in rest.items())
+                for index, count in enumerate(counts):
+                    mines[index] += count * factor
+            for cell, count in zip(cells, mines):
+                probabilities[cell] = count / total
+
+        if others:
+            # Placements in which a given other cell is a mine
+            mines = sum(ways * weight(k + 1, others - 1)
+                        for k, ways in prefixes[-1].items())
+            frontier = set().union(*(cells for cells, _ in groups))
+            for cell in unknown - frontier:
+                probabilities[cell] = mines / total
+        return probabilities
+
+    def groups(self):
+        """
+        Yields (cells, constraints) for each group of unknown cells
+        linked by sentences, where `constraints` holds the (cells, count)
+        of its sentences and `cells` lists its cells in the order in
+        which they are reached from the first one.
+        """
+        seen = set()
+        for start in sorted(self.containing):
+            if start in seen or not self.containing[start]:
+                continue
+            seen.add(start)
+            cells = [start]
+            sentence_ids = set()
+            for cell in cells:
+                for sentence_id in sorted(self.containing[cell]):
+                    if sentence_id in sentence_ids:
+                        continue
+                    sentence_ids.add(sentence_id)
+                    for other in sorted(self.sentences[sentence_id].cells):
+                        if other not in seen:
+                            seen.add(other)
+                            cells.append(other)
+            constraints = [(frozenset(self.sentences[sentence_id].cells),
+                            self.sentences[sentence_id].count)
+                           for sentence_id in sorted(sentence_ids)]
+            yield cells, constraints
+
+    def estimate(self, unknown):
+        """
+        Returns estimated mine probabilities of the unknown cells: the
+        highest share of mines among the cells of any sentence holding
+        the cell, or for other cells the share of the mines left.
+        """
+        frontier = {}
+        for sentence in self.sentences.values():
+            share = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                frontier[cell] = max(frontier.get(cell, 0.0), share)
+
+        others = len(unknown) - len(frontier)
+        left = self.mine_count - len(self.mines) - sum(frontier.values())
+        density = min(1.0, max(0.0, left / others)) if others else 1.0
+        return {cell: frontier.get(cell, density) for cell in unknown}
+
+
+def count_configurations(cells, constraints, deadline=math.inf):
+    """
+    Counts the ways to place mines on `cells` satisfying every
+    (cells, count) constraint. Returns a dict mapping each possible
+    number of mines k to (ways, mines), where `ways` is the number of
+    placements with k mines and `mines[i]` the number of those in which
+    cells[i] is a mine.
+
+    Cells are assigned in order by backtracking, and the count from each
+    cell on is memoized by how many mines each constraint still needs,
+    so placements that differ only in cells already behind the search
+    are counted once. Raises Timeout after `deadline`.
+    """
+    position = {cell: index for index, cell in enumerate(cells)}
+
+    # For each cell, the constraints on it with how many of their cells
+    # come after it
+    touching = [[] for _ in cells]
+    for index, (constrained, _) in enumerate(constraints):
+        order = sorted(position[cell] for cell in constrained)
+        for rank, cell_index in enumerate(order):
+            touching[cell_index].append((index, len(order) - rank - 1))
+
+    memo = {}
+    nodes = 0
+
+    def count(index, needs):
+        nonlocal nodes
+        if index == len(cells):
+            return {0: (1, ())}
+        if (index, needs) in memo:
+            return memo[(index, needs)]
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() > deadline:
+            raise Timeout
+
+        result = {}
+        for mine in (0, 1):
+            remaining = list(needs)
+            for constraint, after in touching[index]:
+                remaining[constraint] -= mine
+                if not 0 <= remaining[constraint] <= after:
+                    break
+            else:
+                for k, (ways, mines) in count(index + 1, tuple(remaining)).items():
+                    mines = (ways if mine else 0,) + mines
+                    if k + mine in result:
+                        total, counts = result[k + mine]
+                        result[k + mine] = (total + ways, tuple(map(sum, zip(counts, mines))))
+                    else:
+                        result[k + mine] = (ways, mines)
+        memo[(index, needs)] = result
+        return result
+
+    return count(0, tuple(needed for _, needed in constraints))
+
+
+def convolve(a, b):
+    """
+    Returns the distribution of the total number of mines of two
+    independent {mines: ways} distributions.
+    """
+    result = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result